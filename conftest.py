@@ -24,6 +24,13 @@ def test_data():
     }
 
 
+@pytest.fixture(scope="session")
+def audio_corpus():
+    """Seeded synthetic call audio, cached on disk and shared across workers"""
+    from framework.utils.audio_corpus import AudioCorpus
+    return AudioCorpus(seed=1234)
+
+
 @pytest.fixture
 def test_user(test_data):
     """Get standard test user"""
@@ -0,0 +1,161 @@
+"""
+Parallel accent/dialect test matrix
+Every accent x condition x utterance combination runs through a pool of ASR
+workers, each holding one client and one session, and the results are
+aggregated per accent with bootstrap confidence bounds
+"""
+import itertools
+import threading
+import zlib
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+import numpy as np
+from loguru import logger
+from framework.utils.audio_codec import as_pcm16, decode, encode
+from framework.utils.audio_corpus import clip, packet_loss, silence
+from framework.utils.caption_quality import CaptionQualityAnalyzer
+from framework.utils.captioning_pipeline import CaptioningPipeline
+
+
+def degrade(codec: str = None, sample_rate: int = 8000, noise_db: float = None,
+            loss_rate: float = None, clip_db: float = None, seed: int = 0) -> Callable[[bytes], bytes]:
+    """
+    Audio transform for a test condition: clipping, line noise, packet loss
+    Audio is G.711 with codec, otherwise 16-bit PCM, and comes back in the
+    same format. The randomness is seeded from the audio itself, so an
+    utterance gets the same degradation whichever worker processes it.
+    """
+    def transform(audio) -> bytes:
+        samples = decode(audio, codec) if codec else as_pcm16(audio)
+        rng = np.random.default_rng([seed, zlib.crc32(samples.tobytes())])
+        signal = samples.astype(np.float64)
+        if clip_db is not None:
+            signal = clip(signal, clip_db)
+        if noise_db is not None:
+            signal = signal + silence(rng, len(signal), sample_rate, noise_db)
+        if loss_rate:
+            signal = packet_loss(rng, signal, sample_rate, loss_rate)
+        samples = np.clip(np.rint(signal), -32768, 32767).astype('<i2')
+        return encode(samples, codec) if codec else samples.tobytes()
+    return transform
+
+
+class AccentMatrixRunner:
+    """
+    Runs an accent test matrix across a pool of ASR workers
+    asr_factory builds one client per worker; each worker starts a single
+    session and keeps it for every case it handles. conditions maps a
+    condition name to an audio transform (None for the audio as recorded)
+    and is applied on the worker, so degradation runs in parallel too.
+    Cases are generated lazily and the pipeline's bounded queue throttles
+    submission, so the whole matrix is never held in memory.
+    """
+    
+    def __init__(self, asr_factory: Callable[[], Any], workers: int = 8,
+                 conditions: Dict[str, Callable[[bytes], bytes]] = None, queue_size: int = 64,
+                 analyzer: CaptionQualityAnalyzer = None, language: str = "en-US"):
+        self.asr_factory = asr_factory
+        self.workers = workers
+        self.conditions = conditions or {'clean': None}
+        self.queue_size = queue_size
+        self.analyzer = analyzer or CaptionQualityAnalyzer()
+        self.language = language
+        self.clients: List[Any] = []
+        self._worker_ids = itertools.count()
+        self._lock = threading.Lock()
+    
+    def cases(self, corpus: Dict[str, List[Tuple[str, bytes]]]) -> Iterator[Dict[str, Any]]:
+        """Every accent x condition x utterance combination, one at a time"""
+        for accent, utterances in corpus.items():
+            for condition in self.conditions:
+                for index, (reference, audio) in enumerate(utterances):
+                    yield {'accent': accent, 'condition': condition, 'utterance': index,
+                           'reference': reference, 'audio': audio}
+    
+    def _start_worker(self):
+        """One client and one session for a worker thread"""
+        client = self.asr_factory()
+        client.start_session(f"accent_matrix_{next(self._worker_ids)}", self.language)
+        with self._lock:
+            self.clients.append(client)
+        return client
+    
+    def _transcribe(self, asr, case: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply the case's condition and transcribe it; the audio is dropped afterwards"""
+        audio = case.pop('audio')
+        transform = self.conditions[case['condition']]
+        result = asr.process_audio(transform(audio) if transform else audio, case['reference'])
+        case['transcription'] = result['transcription']
+        case['latency_ms'] = result['latency_ms']
+        return case
+    
+    def run(self, corpus: Dict[str, List[Tuple[str, bytes]]], bootstrap_resamples: int = 1000,
+            confidence: float = 0.95, seed: int = None) -> Dict[str, Any]:
+        """
+        Run the matrix and aggregate it
+        corpus: Dict of {accent_name: [(reference_text, audio_data), ...]}
+        Returns per-accent statistics with confidence intervals, per
+        accent/condition cell means, the overall summary, and failures and
+        throughput from the pipeline
+        """
+        self.clients = []
+        pipeline = CaptioningPipeline(queue_size=self.queue_size)
+        pipeline.add_stage('asr', self._transcribe, self.workers, worker_state=self._start_worker)
+        results = pipeline.run(self.cases(corpus))
+        for client in self.clients:
+            client.end_session()
+        
+        # Workers finish in any order; scoring in case order keeps seeded intervals reproducible
+        completed = sorted((r['item'] for r in results if r['error'] is None),
+                           key=lambda case: (case['accent'], case['condition'], case['utterance']))
+        errors: Dict[str, int] = {}
+        for r in results:
+            if r['error'] is not None:
+                errors[r['item']['accent']] = errors.get(r['item']['accent'], 0) + 1
+        metrics = pipeline.get_metrics()
+        logger.info(f"Accent matrix: {len(completed)} cases across {len(corpus)} accents and "
+                    f"{len(self.conditions)} conditions, {metrics['failed']} failed, "
+                    f"{metrics['throughput_per_s']:.1f} cases/s on {self.workers} workers")
+        
+        report = {
+            'workers': self.workers,
+            'sessions': len(self.clients),
+            'completed': len(completed),
+            'failed': metrics['failed'],
+            'errors': errors,
+            'elapsed_s': metrics['elapsed_s'],
+            'throughput_per_s': metrics['throughput_per_s'],
+            'accents': {},
+            'cells': {},
+            'summary': None
+        }
+        if not completed:
+            return report
+        
+        analysis = self.analyzer.batch_analyze(
+            [(case['reference'], case['transcription'], case['latency_ms'], case['accent']) for case in completed],
+            bootstrap_resamples=bootstrap_resamples, confidence=confidence, seed=seed,
+            columnar=True, by_category=True
+        )
+        report['accents'] = analysis['summary'].pop('by_category')
+        report['summary'] = analysis['summary']
+        report['cells'] = self._cell_means(completed, analysis['individual_results'])
+        return report
+    
+    def _cell_means(self, completed: List[Dict[str, Any]], scored) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Mean WER, accuracy and latency per accent and condition"""
+        cells = sorted({(case['accent'], case['condition']) for case in completed})
+        index = {cell: code for code, cell in enumerate(cells)}
+        codes = np.array([index[(case['accent'], case['condition'])] for case in completed])
+        totals = np.bincount(codes, minlength=len(cells))
+        sums = {column: np.bincount(codes, weights=getattr(scored, column), minlength=len(cells))
+                for column in ('wer', 'accuracy', 'latency_ms')}
+        
+        report: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for (accent, condition), code in index.items():
+            report.setdefault(accent, {})[condition] = {
+                'total_tests': int(totals[code]),
+                'avg_wer': sums['wer'][code] / totals[code],
+                'avg_accuracy': sums['accuracy'][code] / totals[code],
+                'avg_latency_ms': sums['latency_ms'][code] / totals[code]
+            }
+        return report
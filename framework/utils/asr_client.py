@@ -2,60 +2,263 @@
 ASR (Automatic Speech Recognition) client for testing
 Tests speech-to-text conversion accuracy and latency
 """
-import time
+import itertools
 import json
-from typing import Dict, Any, List, Optional, Tuple
+from collections import deque
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import quote, urlparse
+import requests
+from requests.adapters import HTTPAdapter
 from loguru import logger
 from framework.utils.config_loader import ConfigLoader
-from framework.utils.caption_quality import CaptionQualityAnalyzer
+from framework.utils.clock import SystemClock, VirtualClock
+from framework.utils.caption_quality import CaptionQualityAnalyzer, IncrementalWERScorer
+from framework.utils.websocket import OP_BINARY, WebSocketClient
+from framework.utils.audio_codec import AudioConverter
+from framework.utils.vad import VoiceActivityDetector
+from framework.utils.asr_recorder import ASRRecorder
+from framework.utils.latency_measurement import LatencyMeasurement
+from framework.utils.accent_matrix import AccentMatrixRunner
+
+
+def iter_audio_frames(source, frame_bytes: int = 3200) -> Iterator[bytes]:
+    """
+    Lazily cut audio into fixed-size frames
+    source: a binary file-like object (read), a socket (recv) or any iterable
+    of byte chunks. Only one frame is buffered at a time; the last frame may
+    be short.
+    """
+    if hasattr(source, 'read') or hasattr(source, 'recv'):
+        read = source.read if hasattr(source, 'read') else source.recv
+        chunks = iter(lambda: read(frame_bytes), b'')
+    else:
+        chunks = iter(source)
+    
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer += chunk
+        while len(buffer) >= frame_bytes:
+            yield bytes(buffer[:frame_bytes])
+            del buffer[:frame_bytes]
+    if buffer:
+        yield bytes(buffer)
+
+
+def mark_final(items: Iterable) -> Iterator[Tuple[Any, bool]]:
+    """Yield (item, is_last) pairs with one item of lookahead"""
+    iterator = iter(items)
+    try:
+        current = next(iterator)
+    except StopIteration:
+        return
+    for upcoming in iterator:
+        yield current, False
+        current = upcoming
+    yield current, True
+
+
+class ASRStream:
+    """WebSocket streaming session: one JSON result per audio chunk"""
+    
+    def __init__(self, url: str, timeout: float = 10.0):
+        self.ws = WebSocketClient(url, timeout)
+        self.sequence = 0
+    
+    def send(self, audio_data: bytes, reference_text: str = None):
+        """Send one chunk without waiting for its result"""
+        meta = json.dumps({'sequence': self.sequence, 'reference': reference_text}).encode('utf-8')
+        self.ws.send(len(meta).to_bytes(2, 'big') + meta + audio_data, OP_BINARY)
+        self.sequence += 1
+    
+    def receive(self) -> Dict[str, Any]:
+        """Next result, in send order; raises HTTPError for a failed chunk"""
+        _, payload = self.ws.receive()
+        response = json.loads(payload)
+        if response.get('status', 200) != 200:
+            raise requests.HTTPError(f"ASR stream error {response['status']}: {response.get('error')}")
+        return response
+    
+    def transcribe(self, audio_data: bytes, reference_text: str = None) -> Dict[str, Any]:
+        """Send one chunk and wait for its result"""
+        self.send(audio_data, reference_text)
+        return self.receive()
+    
+    def close(self):
+        """Close the WebSocket"""
+        self.ws.close()
+    
+    def __enter__(self) -> 'ASRStream':
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class HTTPASRTransport:
+    """
+    Talks to an ASR service over pooled keep-alive HTTP connections
+    Audio is posted raw to /transcribe; streaming uses the /stream WebSocket
+    """
+    
+    def __init__(self, api_url: str, pool_size: int = 10, timeout: float = 10.0):
+        self.api_url = api_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+    
+    def transcribe(self, audio_data: bytes, session_id: str, reference_text: str = None) -> Dict[str, Any]:
+        """Post one audio chunk and return the service's JSON result"""
+        headers = {'Content-Type': 'application/octet-stream'}
+        if reference_text:
+            headers['X-Reference-Text'] = quote(reference_text)
+        response = self.session.post(f"{self.api_url}/transcribe", params={'session_id': session_id},
+                                     data=audio_data, headers=headers, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+    
+    def open_stream(self, session_id: str) -> ASRStream:
+        """Open a WebSocket streaming session"""
+        url = urlparse(self.api_url)
+        scheme = 'wss' if url.scheme == 'https' else 'ws'
+        return ASRStream(f"{scheme}://{url.netloc}{url.path}/stream?session_id={quote(session_id)}",
+                         self.timeout)
+    
+    def close(self):
+        """Release pooled connections"""
+        self.session.close()
 
 
 class ASRClient:
-    """Client for ASR system testing"""
+    """
+    Client for ASR system testing
+    With input_codec ('ulaw' or 'alaw'), audio is taken as G.711 call audio at
+    input_rate and converted to 16-bit PCM at asr_rate before it is sent.
+    With a vad, streamed chunks it finds silent skip ASR entirely; the vad
+    takes its codec from input_codec unless it already names one. With a
+    recorder, process_audio records responses or replays recorded ones.
+    """
     
-    def __init__(self, api_url: str = None):
+    def __init__(self, api_url: str = None, clock=None, processing_delay: float = 0.0,
+                 network=None, transport: HTTPASRTransport = None, input_codec: str = None,
+                 input_rate: int = 8000, asr_rate: int = 16000, vad: VoiceActivityDetector = None,
+                 recorder: ASRRecorder = None):
         self.config = ConfigLoader().load_config()
         self.api_url = api_url or self.config.get('asr', {}).get('api_url', '')
+        self.clock = clock or SystemClock()
+        self.processing_delay = processing_delay
+        self.network = network
+        self.transport = transport
         self.quality_analyzer = CaptionQualityAnalyzer()
         self.session_id = None
+        self.language = None
+        self.input_codec = input_codec
+        self.input_rate = input_rate
+        self.asr_rate = asr_rate
+        self.converter = AudioConverter(input_codec, input_rate, asr_rate) if input_codec else None
+        if vad is not None and input_codec:
+            # The detector sees chunks before conversion, i.e. in the input format
+            if vad.codec is None:
+                vad.codec = input_codec
+            if vad.sample_rate != input_rate:
+                raise ValueError(f"VAD sample rate {vad.sample_rate} does not match input rate {input_rate}")
+        if vad is not None and vad.codec != input_codec:
+            raise ValueError(f"VAD codec {vad.codec} does not match input codec {input_codec}")
+        self.vad = vad
+        self.recorder = recorder
     
     def start_session(self, call_id: str, language: str = "en-US") -> str:
         """Start ASR session for a call"""
-        self.session_id = f"asr_session_{call_id}_{int(time.time())}"
+        self.session_id = f"asr_session_{call_id}_{int(self.clock.time())}"
+        self.language = language
+        if self.converter is not None:
+            self.converter.reset()
+        if self.vad is not None:
+            self.vad.reset()
         logger.info(f"ASR session started: {self.session_id} for call {call_id}")
         return self.session_id
     
     def process_audio(self, audio_data: bytes, reference_text: str = None) -> Dict[str, Any]:
         """
         Process audio through ASR and return transcription
-        In real implementation, this would call ASR API
-        For testing, we simulate with reference text
+        With a transport, this calls the ASR service
+        Otherwise, we simulate with reference text
         """
-        start_time = time.time()
+        start_time = self.clock.time()
+        attempts = 0
+        if self.converter is not None:
+            audio_data = self.converter.convert(audio_data)
         
-        # Simulate ASR processing delay
-        processing_time = 0.1  # 100ms typical ASR processing
+        recording_key = None
+        if self.recorder is not None:
+            recording_key = self.recorder.key(audio_data, language=self.language, reference=reference_text)
+            if self.recorder.mode != 'record':
+                replayed = self._replay(recording_key, start_time, reference_text)
+                if replayed is not None:
+                    return replayed
         
-        # In real implementation:
-        # response = requests.post(f"{self.api_url}/transcribe", 
-        #                         files={'audio': audio_data})
-        # transcription = response.json()['text']
+        # Upload over the emulated network; ConnectionError if every retry is lost
+        if self.network is not None:
+            delay, attempts = self.network.send_reliable(len(audio_data))
+            self.clock.sleep(delay)
         
-        # For testing, use reference text if provided
-        if reference_text:
+        # Simulate ASR processing delay (about 100ms is typical); free on a VirtualClock
+        self.clock.sleep(self.processing_delay)
+        
+        confidence = 0.95  # Simulated confidence score
+        if self.transport is not None:
+            response = self.transport.transcribe(audio_data, self.session_id or 'default', reference_text)
+            transcription = response['text']
+            confidence = response.get('confidence', confidence)
+        elif reference_text:
+            # For testing, use reference text if provided
             transcription = reference_text
         else:
             # Simulate transcription (would be actual ASR output)
             transcription = "Simulated transcription from ASR"
         
-        end_time = time.time()
-        latency_ms = (end_time - start_time) * 1000
+        if self.network is not None:
+            delay, response_attempts = self.network.send_reliable(len(transcription.encode('utf-8')))
+            self.clock.sleep(delay)
+            attempts += response_attempts
+        
+        end_time = self.clock.time()
+        result = self._build_result(transcription, (end_time - start_time) * 1000,
+                                    confidence, reference_text)
+        if self.network is not None:
+            result['network_attempts'] = attempts
+        if recording_key is not None:
+            self.recorder.record(recording_key, transcription, confidence, result['latency_ms'])
+        return result
+    
+    def _replay(self, key: bytes, start_time: float, reference_text: str = None) -> Optional[Dict[str, Any]]:
+        """
+        Result from a recorded response, or None to call the service
+        With simulate_latency the recorded latency passes on the clock
+        """
+        recorded = self.recorder.lookup(key)
+        if recorded is None:
+            if self.recorder.mode == 'replay':
+                raise LookupError(f"No recorded ASR response for session {self.session_id}")
+            return None
         
+        if self.recorder.simulate_latency:
+            self.clock.sleep(recorded['latency_ms'] / 1000)
+        result = self._build_result(recorded['transcription'], (self.clock.time() - start_time) * 1000,
+                                    recorded['confidence'], reference_text)
+        result['replayed'] = True
+        result['recorded_latency_ms'] = recorded['latency_ms']
+        return result
+    
+    def _build_result(self, transcription: str, latency_ms: float, confidence: float,
+                      reference_text: str = None) -> Dict[str, Any]:
+        """Result dict for one transcribed chunk"""
         result = {
             'transcription': transcription,
             'latency_ms': latency_ms,
-            'confidence': 0.95,  # Simulated confidence score
-            'timestamp': time.time(),
+            'confidence': confidence,
+            'timestamp': self.clock.time(),
             'session_id': self.session_id
         }
         
@@ -69,17 +272,94 @@ class ASRClient:
         logger.info(f"ASR processed: {len(transcription)} chars, latency: {latency_ms:.2f}ms")
         return result
     
-    def process_streaming_audio(self, audio_chunks: List[bytes], 
+    def process_streaming_audio(self, audio_chunks: Iterable[bytes], 
                                reference_texts: List[str] = None) -> List[Dict[str, Any]]:
-        """Process streaming audio chunks"""
-        results = []
+        """
+        Process streaming audio chunks
+        Chunks can be any iterable, e.g. AudioFile.chunks() over a recording
+        With reference texts, each result also carries the running WER of the
+        transcript so far against the full reference
+        """
+        reference = " ".join(reference_texts) if reference_texts else None
+        return list(self.iter_streaming_audio(audio_chunks, reference_texts, reference))
+    
+    def iter_streaming_audio(self, audio_frames: Iterable[bytes], reference_texts: Iterable[str] = None,
+                             reference: str = None, max_in_flight: int = 4) -> Iterator[Dict[str, Any]]:
+        """
+        Stream audio frames lazily and yield each result as it arrives
+        Frames can come from any iterable, e.g. iter_audio_frames over a file
+        or socket, and are only read as the window allows. With a transport,
+        up to max_in_flight chunks are sent over one WebSocket before waiting
+        for results; without one, chunks are processed one at a time. Results
+        come in order, tagged with their sequence number and whether they
+        are final. With a full reference, each also carries the running WER.
+        Chunks the VAD finds silent are not sent; their results are empty
+        and marked vad_skipped.
+        """
+        scorer = IncrementalWERScorer(reference) if reference else None
+        references = iter(reference_texts) if reference_texts is not None else iter(())
         
-        for i, chunk in enumerate(audio_chunks):
-            reference = reference_texts[i] if reference_texts and i < len(reference_texts) else None
-            result = self.process_audio(chunk, reference)
-            results.append(result)
+        if self.transport is None:
+            for sequence, (chunk, final) in enumerate(mark_final(audio_frames)):
+                chunk_reference = next(references, None)
+                if self.vad is None or self.vad.is_speech(chunk):
+                    result = self.process_audio(chunk, chunk_reference)
+                else:
+                    result = self._skipped_result(chunk_reference)
+                yield self._stream_result(result, sequence, final, scorer)
+            return
         
-        return results
+        stream = self.transport.open_stream(self.session_id or 'default')
+        pending = deque()  # (sequence, final, reference, sent_at) per chunk; sent_at None if skipped
+        in_flight = 0
+        try:
+            for sequence, (chunk, final) in enumerate(mark_final(audio_frames)):
+                chunk_reference = next(references, None)
+                if self.vad is None or self.vad.is_speech(chunk):
+                    while in_flight >= max_in_flight:
+                        sent = pending.popleft()
+                        in_flight -= sent[3] is not None
+                        yield self._receive_stream_result(stream, sent, scorer)
+                    pending.append((sequence, final, chunk_reference, self.clock.time()))
+                    in_flight += 1
+                    if self.converter is not None:
+                        chunk = self.converter.convert(chunk)
+                    stream.send(chunk, chunk_reference)
+                else:
+                    pending.append((sequence, final, chunk_reference, None))
+                # Skipped chunks need no reply, so release them as soon as they reach the front
+                while pending and pending[0][3] is None:
+                    yield self._receive_stream_result(stream, pending.popleft(), scorer)
+            while pending:
+                yield self._receive_stream_result(stream, pending.popleft(), scorer)
+        finally:
+            stream.close()
+    
+    def _receive_stream_result(self, stream: ASRStream, sent: Tuple[int, bool, Optional[str], Optional[float]],
+                               scorer: Optional[IncrementalWERScorer]) -> Dict[str, Any]:
+        """Wait for the oldest in-flight chunk's result"""
+        sequence, final, reference_text, sent_at = sent
+        if sent_at is None:
+            return self._stream_result(self._skipped_result(reference_text), sequence, final, scorer)
+        response = stream.receive()
+        result = self._build_result(response['text'], (self.clock.time() - sent_at) * 1000,
+                                    response.get('confidence', 0.95), reference_text)
+        return self._stream_result(result, sequence, final, scorer)
+    
+    def _skipped_result(self, reference_text: str = None) -> Dict[str, Any]:
+        """Result for a chunk the VAD kept away from ASR"""
+        result = self._build_result('', 0.0, 0.0, reference_text)
+        result['vad_skipped'] = True
+        return result
+    
+    def _stream_result(self, result: Dict[str, Any], sequence: int, final: bool,
+                       scorer: Optional[IncrementalWERScorer]) -> Dict[str, Any]:
+        """Tag a chunk result with its position and running WER"""
+        result['sequence'] = sequence
+        result['final'] = final
+        if scorer is not None:
+            result['running_wer'] = scorer.append(result['transcription'])
+        return result
     
     def test_asr_accuracy(self, test_cases: List[Tuple[str, str]]) -> Dict[str, Any]:
         """
@@ -115,28 +395,36 @@ class ASRClient:
             'average_accuracy': 1 - avg_wer
         }
     
-    def test_asr_latency(self, audio_data: bytes, iterations: int = 10) -> Dict[str, Any]:
-        """Test ASR latency with multiple iterations"""
-        latencies = []
-        
-        for _ in range(iterations):
-            result = self.process_audio(audio_data)
-            latencies.append(result['latency_ms'])
-        
-        return {
-            'iterations': iterations,
-            'latencies_ms': latencies,
-            'average_latency_ms': sum(latencies) / len(latencies),
-            'min_latency_ms': min(latencies),
-            'max_latency_ms': max(latencies),
-            'p95_latency_ms': sorted(latencies)[int(len(latencies) * 0.95)]
-        }
+    def test_asr_latency(self, audio_data: bytes, iterations: int = 10, warmup: int = 0,
+                         rate_per_s: float = None) -> Dict[str, Any]:
+        """
+        Test ASR latency with multiple iterations
+        warmup calls run first and are not timed. With rate_per_s, requests
+        are issued open loop at that rate and percentiles are corrected for
+        coordinated omission. Raises RuntimeError if every iteration fails.
+        """
+        measurement = LatencyMeasurement(self.clock, warmup, rate_per_s)
+        return measurement.run(lambda: self.process_audio(audio_data), iterations)
     
-    def test_different_accents(self, test_cases: Dict[str, Tuple[str, bytes]]) -> Dict[str, Any]:
+    def test_different_accents(self, test_cases: Dict[str, Tuple[str, bytes]],
+                               workers: int = 1) -> Dict[str, Any]:
         """
         Test ASR with different accents/dialects
         test_cases: Dict of {accent_name: (reference_text, audio_data)}
+        workers > 1 transcribes the accents in parallel, one session per worker
         """
+        if workers > 1:
+            matrix = self.test_accent_matrix({accent: [case] for accent, case in test_cases.items()},
+                                             workers=workers, bootstrap_resamples=0)
+            return {
+                accent: {
+                    'wer': stats['avg_wer'],
+                    'accuracy': stats['avg_accuracy'],
+                    'latency_ms': stats['avg_latency_ms']
+                }
+                for accent, stats in matrix['accents'].items()
+            }
+        
         results = {}
         
         for accent, (reference, audio) in test_cases.items():
@@ -150,6 +438,44 @@ class ASRClient:
         
         return results
     
+    def test_accent_matrix(self, corpus: Dict[str, List[Tuple[str, bytes]]],
+                           conditions: Dict[str, Any] = None, workers: int = 8,
+                           asr_factory=None, bootstrap_resamples: int = 1000,
+                           confidence: float = 0.95, seed: int = None) -> Dict[str, Any]:
+        """
+        Run every accent x condition x utterance combination across a worker pool
+        corpus: Dict of {accent_name: [(reference_text, audio_data), ...]}
+        conditions: Dict of {condition_name: audio transform}, e.g. from
+        accent_matrix.degrade; by default the audio is used as recorded
+        asr_factory builds each worker's client; by default each worker gets
+        its own transport, network emulator (seeded with the base seed plus
+        the worker index) and, on a VirtualClock, its own clock starting at
+        this client's time, so per-case latency only includes that case's
+        own delays. A recorder is shared; its store serializes access from
+        the workers.
+        """
+        worker_ids = itertools.count()
+        runner = AccentMatrixRunner(asr_factory or (lambda: self._worker_client(next(worker_ids))),
+                                    workers, conditions, analyzer=self.quality_analyzer,
+                                    language=self.language or "en-US")
+        try:
+            return runner.run(corpus, bootstrap_resamples, confidence, seed)
+        finally:
+            if asr_factory is None:
+                for client in runner.clients:
+                    if client.transport is not None:
+                        client.transport.close()
+    
+    def _worker_client(self, worker: int) -> 'ASRClient':
+        """A client for a parallel worker, configured like this one but sharing no mutable state"""
+        clock = VirtualClock(self.clock.time()) if isinstance(self.clock, VirtualClock) else self.clock
+        network = self.network.fork(clock, worker) if self.network is not None else None
+        transport = None
+        if self.transport is not None:
+            transport = HTTPASRTransport(self.transport.api_url, timeout=self.transport.timeout)
+        return ASRClient(self.api_url, clock, self.processing_delay, network, transport,
+                         self.input_codec, self.input_rate, self.asr_rate, recorder=self.recorder)
+    
     def end_session(self):
         """End ASR session"""
         if self.session_id:
@@ -0,0 +1,184 @@
+"""
+Record/replay store for ASR responses
+Responses are keyed by a hash of the audio and the session parameters and
+kept in a small SQLite file, so regression suites can re-run without a
+live ASR service while keeping the recorded latency profile
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+from loguru import logger
+from framework.utils.latency_histogram import LatencyHistogram
+from framework.utils.clock import SystemClock
+
+
+MODES = ('record', 'replay', 'auto')
+
+# Rough per-row overhead beyond the transcript, for the size cap
+_ROW_OVERHEAD_BYTES = 64
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key BLOB PRIMARY KEY,
+    transcription TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    latency_ms REAL NOT NULL,
+    recorded_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    size INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+"""
+
+
+class ASRRecorder:
+    """
+    On-disk ASR response store with LRU eviction
+    mode 'record' always calls the service and stores the response, 'replay'
+    only serves stored responses (a miss raises LookupError), and 'auto'
+    replays hits and records misses. max_entries and max_bytes cap the
+    store by evicting least recently used responses; entries older than
+    max_age_s are treated as misses. namespace separates recordings of
+    different ASR models or configurations in one file.
+    """
+    
+    def __init__(self, path, mode: str = 'auto', namespace: str = '', max_entries: int = None,
+                 max_bytes: int = None, max_age_s: float = None, simulate_latency: bool = False,
+                 clock=None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown recorder mode: {mode}")
+        self.path = Path(path)
+        self.mode = mode
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        self.simulate_latency = simulate_latency
+        self.clock = clock or SystemClock()
+        self.stats = {'hits': 0, 'misses': 0, 'recorded': 0, 'evicted': 0, 'expired': 0}
+        self._lock = threading.Lock()
+        # Hits only touch memory; last-used times are written back in batches
+        self._touched: Dict[bytes, float] = {}
+        
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        # Store size is tracked in memory so caps can be checked without a table scan
+        self._entries, self._stored_bytes = self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+    
+    def key(self, audio_data, **params) -> bytes:
+        """16-byte digest of the audio and the session parameters"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(json.dumps({'namespace': self.namespace, **params}, sort_keys=True).encode('utf-8'))
+        digest.update(audio_data)
+        return digest.digest()
+    
+    def lookup(self, key: bytes) -> Optional[Dict[str, Any]]:
+        """Stored response for a key, or None"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT transcription, confidence, latency_ms, recorded_at FROM responses WHERE key = ?",
+                (key,)).fetchone()
+            now = self.clock.time()
+            if row is not None and self.max_age_s is not None and now - row[3] > self.max_age_s:
+                self._delete(key)
+                self.stats['expired'] += 1
+                row = None
+            if row is None:
+                self.stats['misses'] += 1
+                return None
+            
+            self.stats['hits'] += 1
+            self._touched[key] = now
+            if len(self._touched) >= 256:
+                self._flush_touched()
+        return {'transcription': row[0], 'confidence': row[1], 'latency_ms': row[2], 'recorded_at': row[3]}
+    
+    def record(self, key: bytes, transcription: str, confidence: float, latency_ms: float):
+        """Store or replace a response, then evict down to the caps"""
+        now = self.clock.time()
+        size = len(transcription.encode('utf-8')) + _ROW_OVERHEAD_BYTES
+        with self._lock:
+            replaced = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, transcription, confidence, latency_ms, now, now, size))
+            if replaced is None:
+                self._entries += 1
+            self._stored_bytes += size - (replaced[0] if replaced else 0)
+            self.stats['recorded'] += 1
+            self._evict()
+    
+    def _flush_touched(self):
+        """Write batched last-used times; caller holds the lock"""
+        if self._touched:
+            self._db.executemany("UPDATE responses SET last_used = ? WHERE key = ?",
+                                 [(used, key) for key, used in self._touched.items()])
+            self._touched.clear()
+    
+    def _delete(self, key: bytes):
+        """Remove one row and its share of the tracked totals; caller holds the lock"""
+        row = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._entries -= 1
+            self._stored_bytes -= row[0]
+    
+    def _evict(self):
+        """Drop least recently used rows until under both caps; caller holds the lock"""
+        excess_rows = max(0, self._entries - self.max_entries) if self.max_entries is not None else 0
+        excess_bytes = max(0, self._stored_bytes - self.max_bytes) if self.max_bytes is not None else 0
+        if not excess_rows and not excess_bytes:
+            return
+        
+        self._flush_touched()
+        victims = []
+        freed = 0
+        for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY last_used"):
+            if len(victims) >= excess_rows and freed >= excess_bytes:
+                break
+            victims.append((key,))
+            freed += size
+        self._db.executemany("DELETE FROM responses WHERE key = ?", victims)
+        self._entries -= len(victims)
+        self._stored_bytes -= freed
+        self.stats['evicted'] += len(victims)
+        logger.debug(f"ASR recorder evicted {len(victims)} responses")
+    
+    def latency_profile(self) -> LatencyHistogram:
+        """Histogram of every recorded latency, e.g. to drive simulated service times"""
+        histogram = LatencyHistogram()
+        with self._lock:
+            for (latency_ms,) in self._db.execute("SELECT latency_ms FROM responses"):
+                histogram.record(latency_ms)
+        return histogram
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Hit rate, store size and eviction counts"""
+        with self._lock:
+            count, total = self._entries, self._stored_bytes
+        lookups = self.stats['hits'] + self.stats['misses']
+        return {
+            **self.stats,
+            'entries': count,
+            'stored_bytes': total,
+            'hit_rate': self.stats['hits'] / lookups if lookups else 0.0
+        }
+    
+    def close(self):
+        """Write back pending last-used times and close the store"""
+        with self._lock:
+            self._flush_touched()
+            self._db.close()
+    
+    def __enter__(self) -> 'ASRRecorder':
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,251 @@
+"""
+Local ASR stand-in service
+HTTP and WebSocket endpoints with configurable service-time distributions,
+concurrency limits, error injection and scripted transcripts, so client
+latency tests exercise real serialization and connection handling
+"""
+import json
+import random
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+from loguru import logger
+from framework.utils.websocket import (OP_BINARY, OP_CLOSE, OP_PING, OP_PONG, OP_TEXT,
+                                       accept_key, encode_frame, read_frame)
+
+
+DEFAULT_TRANSCRIPT = "Simulated transcription from ASR"
+
+
+class ServiceTimeModel:
+    """
+    Seeded service-time distribution in milliseconds
+    distribution: 'fixed' (ms), 'uniform' (low_ms, high_ms),
+    'exponential' (mean_ms) or 'lognormal' (median_ms, sigma)
+    """
+    
+    def __init__(self, distribution: str = 'fixed', seed: int = None, **params):
+        if distribution not in ('fixed', 'uniform', 'exponential', 'lognormal'):
+            raise ValueError(f"Unknown service-time distribution: {distribution}")
+        self.distribution = distribution
+        self.params = params
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+    
+    def sample_ms(self) -> float:
+        """Draw one service time"""
+        p = self.params
+        with self._lock:
+            if self.distribution == 'fixed':
+                return p.get('ms', 0.0)
+            if self.distribution == 'uniform':
+                return self._rng.uniform(p['low_ms'], p['high_ms'])
+            if self.distribution == 'exponential':
+                return self._rng.expovariate(1 / p['mean_ms'])
+            return self._rng.lognormvariate(0.0, p.get('sigma', 0.5)) * p['median_ms']
+
+
+class ASRStubServer:
+    """
+    Threaded local ASR server
+    POST /transcribe takes raw audio, with the session in the session_id query
+    parameter and an optional URL-encoded X-Reference-Text header. GET /stream
+    upgrades to a WebSocket that takes one binary message per chunk: a 2-byte
+    metadata length, JSON metadata, then the audio. Both reply with JSON
+    results. Transcripts come from the script (per session, in order), else
+    the reference text, else a fixed placeholder.
+    """
+    
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, service_time: ServiceTimeModel = None,
+                 max_concurrency: int = None, reject_when_busy: bool = False,
+                 error_rate: float = 0.0, script: List[str] = None, seed: int = None):
+        self.host = host
+        self.port = port
+        self.service_time = service_time or ServiceTimeModel('fixed', ms=0.0)
+        self.max_concurrency = max_concurrency
+        self.reject_when_busy = reject_when_busy
+        self.error_rate = error_rate
+        self.script = script
+        self._rng = random.Random(seed)
+        self._slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
+        self._lock = threading.Lock()
+        self._script_positions: Dict[str, int] = {}
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {'requests': 0, 'connections': 0, 'errors_injected': 0, 'rejected': 0,
+                      'in_flight': 0, 'peak_in_flight': 0, 'sessions': 0, 'peak_sessions': 0,
+                      'audio_bytes': 0}
+    
+    @property
+    def url(self) -> str:
+        """Base HTTP URL of the running server"""
+        return f"http://{self.host}:{self.port}"
+    
+    def start(self) -> 'ASRStubServer':
+        """Start serving on a background thread"""
+        handler = type('BoundASRHandler', (_ASRRequestHandler,), {'asr_server': self})
+        self._server = ThreadingHTTPServer((self.host, self.port), handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name='asr-stub', daemon=True)
+        self._thread.start()
+        logger.info(f"ASR stand-in server listening on {self.url}")
+        return self
+    
+    def stop(self):
+        """Stop serving and close the listening socket"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+            logger.info(f"ASR stand-in server stopped after {self.stats['requests']} requests")
+    
+    def __enter__(self) -> 'ASRStubServer':
+        return self.start()
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+    
+    def _count(self, key: str, amount: int = 1):
+        """Thread-safe counter update"""
+        with self._lock:
+            self.stats[key] += amount
+    
+    def open_session(self):
+        """Count an open WebSocket session"""
+        with self._lock:
+            self.stats['sessions'] += 1
+            self.stats['peak_sessions'] = max(self.stats['peak_sessions'], self.stats['sessions'])
+    
+    def close_session(self):
+        """Count a closed WebSocket session"""
+        self._count('sessions', -1)
+    
+    def _next_transcript(self, session_id: str, reference: Optional[str]) -> str:
+        """Scripted transcript for the session, else the reference text"""
+        if self.script:
+            with self._lock:
+                position = self._script_positions.get(session_id, 0)
+                self._script_positions[session_id] = position + 1
+            return self.script[position % len(self.script)]
+        return reference or DEFAULT_TRANSCRIPT
+    
+    def transcribe(self, session_id: str, audio_size: int, reference: Optional[str]) -> Tuple[int, Dict[str, Any]]:
+        """Serve one transcription request; returns (HTTP status, JSON body)"""
+        self._count('requests')
+        self._count('audio_bytes', audio_size)
+        
+        if self._slots is not None and not self._slots.acquire(blocking=not self.reject_when_busy):
+            self._count('rejected')
+            return 503, {'error': 'ASR service at capacity'}
+        try:
+            with self._lock:
+                self.stats['in_flight'] += 1
+                self.stats['peak_in_flight'] = max(self.stats['peak_in_flight'], self.stats['in_flight'])
+                failed = self._rng.random() < self.error_rate
+            
+            service_ms = self.service_time.sample_ms()
+            time.sleep(service_ms / 1000)
+        finally:
+            self._count('in_flight', -1)
+            if self._slots is not None:
+                self._slots.release()
+        
+        if failed:
+            self._count('errors_injected')
+            return 500, {'error': 'Injected ASR failure'}
+        return 200, {
+            'text': self._next_transcript(session_id, reference),
+            'confidence': 0.95,
+            'service_time_ms': service_ms,
+            'session_id': session_id
+        }
+
+
+class _ASRRequestHandler(BaseHTTPRequestHandler):
+    """HTTP/1.1 keep-alive handler; asr_server is bound per server instance"""
+    
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    asr_server: ASRStubServer = None
+    
+    def setup(self):
+        super().setup()
+        self.asr_server._count('connections')
+    
+    def log_message(self, format, *args):
+        logger.debug(f"ASR stand-in: {format % args}")
+    
+    def _send_json(self, status: int, body: Dict[str, Any]):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/health':
+            self._send_json(200, {'status': 'ok'})
+        elif url.path == '/stream' and self.headers.get('Upgrade', '').lower() == 'websocket':
+            self._serve_websocket(parse_qs(url.query).get('session_id', ['default'])[0])
+        else:
+            self._send_json(404, {'error': 'Not found'})
+    
+    def do_POST(self):
+        url = urlparse(self.path)
+        audio = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if url.path != '/transcribe':
+            self._send_json(404, {'error': 'Not found'})
+            return
+        
+        session_id = parse_qs(url.query).get('session_id', ['default'])[0]
+        reference = self.headers.get('X-Reference-Text')
+        status, body = self.asr_server.transcribe(session_id, len(audio),
+                                                  unquote(reference) if reference else None)
+        self._send_json(status, body)
+    
+    def _serve_websocket(self, session_id: str):
+        """Upgrade to a WebSocket and answer one JSON result per audio message"""
+        # Counted before the handshake completes, so a connected client is always seen as open
+        self.asr_server.open_session()
+        try:
+            self.send_response(101, 'Switching Protocols')
+            self.send_header('Upgrade', 'websocket')
+            self.send_header('Connection', 'Upgrade')
+            self.send_header('Sec-WebSocket-Accept', accept_key(self.headers['Sec-WebSocket-Key']))
+            self.end_headers()
+            self.wfile.flush()
+            self.close_connection = True
+            self._answer_frames(session_id)
+        finally:
+            self.asr_server.close_session()
+    
+    def _answer_frames(self, session_id: str):
+        """Answer WebSocket frames until the client closes the stream"""
+        while True:
+            try:
+                opcode, payload = read_frame(self.rfile)
+            except (ConnectionError, OSError):
+                return
+            if opcode == OP_CLOSE:
+                self.wfile.write(encode_frame(OP_CLOSE, b'', mask=False))
+                return
+            if opcode == OP_PING:
+                self.wfile.write(encode_frame(OP_PONG, payload, mask=False))
+                continue
+            if opcode != OP_BINARY:
+                continue
+            
+            meta_length = struct.unpack('>H', payload[:2])[0]
+            meta = json.loads(payload[2:2 + meta_length] or b'{}')
+            status, body = self.asr_server.transcribe(session_id, len(payload) - 2 - meta_length,
+                                                      meta.get('reference'))
+            body['status'] = status
+            body['sequence'] = meta.get('sequence')
+            self.wfile.write(encode_frame(OP_TEXT, json.dumps(body).encode('utf-8'), mask=False))
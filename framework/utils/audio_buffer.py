@@ -0,0 +1,163 @@
+"""
+PCM audio buffering for telephony and ASR streams
+Fixed-capacity ring buffer over a bytearray that hands out memoryview frames
+instead of copying audio into fresh bytes objects
+"""
+import math
+from typing import Iterable, Iterator, Union
+from loguru import logger
+
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+
+def frame_size(sample_rate: int, frame_ms: int, sample_width: int = 1, channels: int = 1) -> int:
+    """Bytes in one frame, e.g. 160 for 20ms of 8kHz 8-bit G.711"""
+    return sample_rate * frame_ms // 1000 * sample_width * channels
+
+
+def frame_views(audio_data: BytesLike, frame_bytes: int) -> Iterator[memoryview]:
+    """Slice audio into consecutive frames without copying; the last may be short"""
+    view = memoryview(audio_data)
+    for start in range(0, len(view), frame_bytes):
+        yield view[start:start + frame_bytes]
+
+
+class PCMRingBuffer:
+    """
+    Fixed-capacity ring buffer of PCM audio
+    Capacity is rounded up to a whole number of windows, so reads of whole
+    frames or windows never straddle the wrap point and come back as
+    memoryviews into the buffer itself. A returned view stays valid until
+    the next read or release(); only then can writers reuse its space.
+    Writes accept what fits and report how much, which is the producer's
+    backpressure signal.
+    """
+    
+    def __init__(self, sample_rate: int = 8000, frame_ms: int = 20, window_ms: int = None,
+                 capacity_ms: int = 2000, sample_width: int = 1, channels: int = 1):
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.frame_bytes = frame_size(sample_rate, frame_ms, sample_width, channels)
+        self.window_bytes = frame_size(sample_rate, window_ms or frame_ms, sample_width, channels)
+        if self.window_bytes % self.frame_bytes:
+            raise ValueError("window_ms must be a whole number of frames")
+        
+        requested = frame_size(sample_rate, capacity_ms, sample_width, channels)
+        self.capacity = max(1, math.ceil(requested / self.window_bytes)) * self.window_bytes
+        self._buffer = bytearray(self.capacity)
+        self._view = memoryview(self._buffer)
+        self._scratch = bytearray(self.window_bytes)
+        self._read_pos = 0
+        self._size = 0
+        self._held = 0
+        self.stats = {'bytes_written': 0, 'bytes_read': 0, 'copies': 0}
+    
+    def __len__(self) -> int:
+        """Bytes available to read"""
+        return self._size - self._held
+    
+    @property
+    def free(self) -> int:
+        """Bytes that can be written without blocking"""
+        return self.capacity - self._size
+    
+    def write(self, data: BytesLike) -> int:
+        """Copy as much of data as fits; returns the number of bytes accepted"""
+        data = memoryview(data).cast('B')
+        count = min(len(data), self.free)
+        write_pos = (self._read_pos + self._size) % self.capacity
+        first = min(count, self.capacity - write_pos)
+        self._view[write_pos:write_pos + first] = data[:first]
+        self._view[:count - first] = data[first:count]
+        
+        self._size += count
+        self.stats['bytes_written'] += count
+        return count
+    
+    def fill_from(self, source) -> int:
+        """
+        Read straight from a file (readinto) or socket (recv_into) into free space
+        Returns the bytes read; 0 means the source is exhausted or the buffer is full
+        """
+        if not self.free:
+            return 0
+        write_pos = (self._read_pos + self._size) % self.capacity
+        span = self._view[write_pos:write_pos + min(self.free, self.capacity - write_pos)]
+        readinto = source.readinto if hasattr(source, 'readinto') else source.recv_into
+        count = readinto(span) or 0
+        self._size += count
+        self.stats['bytes_written'] += count
+        return count
+    
+    def release(self):
+        """Give the space of the last returned view back to writers"""
+        self._read_pos = (self._read_pos + self._held) % self.capacity
+        self._size -= self._held
+        self._held = 0
+    
+    def read(self, size: int) -> memoryview:
+        """
+        Next size bytes as a view, or an empty view if fewer are buffered
+        Falls back to a copy only when the span wraps, which aligned frame
+        and window reads never do
+        """
+        self.release()
+        if size > self._size:
+            return self._view[:0]
+        
+        end = self._read_pos + size
+        if end <= self.capacity:
+            view = self._view[self._read_pos:end]
+        else:
+            self.stats['copies'] += 1
+            if len(self._scratch) < size:
+                self._scratch = bytearray(size)
+            first = self.capacity - self._read_pos
+            self._scratch[:first] = self._view[self._read_pos:]
+            self._scratch[first:size] = self._view[:size - first]
+            view = memoryview(self._scratch)[:size]
+        
+        self._held = size
+        self.stats['bytes_read'] += size
+        return view
+    
+    def read_frame(self) -> memoryview:
+        """Next telephony frame, e.g. 20ms"""
+        return self.read(self.frame_bytes)
+    
+    def read_window(self) -> memoryview:
+        """Next ASR-sized window"""
+        return self.read(self.window_bytes)
+    
+    def frames(self) -> Iterator[memoryview]:
+        """Yield every complete frame currently buffered"""
+        while len(self) >= self.frame_bytes:
+            yield self.read_frame()
+        self.release()
+    
+    def windows(self) -> Iterator[memoryview]:
+        """Yield every complete ASR window currently buffered"""
+        while len(self) >= self.window_bytes:
+            yield self.read_window()
+        self.release()
+    
+    def rechunk(self, chunks: Iterable[BytesLike], flush: bool = True) -> Iterator[memoryview]:
+        """
+        Re-cut a stream of arbitrary chunks (e.g. 20ms frames) into ASR windows
+        Each window is a view valid until the next one is requested. With
+        flush, a final partial window is yielded at the end.
+        """
+        for chunk in chunks:
+            data = memoryview(chunk).cast('B')
+            while data:
+                accepted = self.write(data)
+                data = data[accepted:]
+                yield from self.windows()
+                if data and not accepted:
+                    logger.warning("PCM ring buffer is full of unread windows")
+                    raise BufferError("Ring buffer capacity is smaller than one window")
+        
+        if flush and len(self):
+            yield self.read(len(self))
+        self.release()
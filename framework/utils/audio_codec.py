@@ -0,0 +1,192 @@
+"""
+Telephony audio codecs and resampling
+G.711 µ-law/A-law companding through NumPy lookup tables and a vectorized
+polyphase FIR resampler for moving between 8 kHz call audio and 16 kHz ASR
+input. Linear PCM is 16-bit signed little-endian throughout.
+"""
+import math
+from typing import Union
+import numpy as np
+
+
+CODECS = ('ulaw', 'alaw')
+TELEPHONY_SAMPLE_RATE = 8000
+
+Samples = Union[bytes, bytearray, memoryview, np.ndarray]
+
+_ULAW_BIAS = 0x84
+_ULAW_CLIP = 8159
+_ULAW_SEGMENT_ENDS = np.array([0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF])
+_ALAW_SEGMENT_ENDS = np.array([0x1F, 0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF])
+
+
+def _build_ulaw_decode() -> np.ndarray:
+    """Linear value of each of the 256 µ-law codes"""
+    code = ~np.arange(256, dtype=np.int32) & 0xFF
+    exponent = (code >> 4) & 0x07
+    magnitude = (((code & 0x0F) << 3) + _ULAW_BIAS << exponent) - _ULAW_BIAS
+    return np.where(code & 0x80, -magnitude, magnitude).astype(np.int16)
+
+
+def _build_alaw_decode() -> np.ndarray:
+    """Linear value of each of the 256 A-law codes"""
+    code = np.arange(256, dtype=np.int32) ^ 0x55
+    segment = (code & 0x70) >> 4
+    value = (code & 0x0F) << 4
+    value = np.where(segment == 0, value + 8, (value + 0x108) << np.maximum(segment - 1, 0))
+    return np.where(code & 0x80, value, -value).astype(np.int16)
+
+
+def _build_ulaw_encode() -> np.ndarray:
+    """µ-law code for every int16 value, indexed by the value as uint16"""
+    pcm = np.arange(65536, dtype=np.int32)
+    pcm = np.where(pcm >= 32768, pcm - 65536, pcm) >> 2
+    mask = np.where(pcm < 0, 0x7F, 0xFF)
+    pcm = np.minimum(np.abs(pcm), _ULAW_CLIP) + (_ULAW_BIAS >> 2)
+    segment = np.searchsorted(_ULAW_SEGMENT_ENDS, pcm)
+    code = np.where(segment >= 8, 0x7F,
+                    (np.minimum(segment, 7) << 4) | ((pcm >> (np.minimum(segment, 7) + 1)) & 0x0F))
+    return (code ^ mask).astype(np.uint8)
+
+
+def _build_alaw_encode() -> np.ndarray:
+    """A-law code for every int16 value, indexed by the value as uint16"""
+    pcm = np.arange(65536, dtype=np.int32)
+    pcm = np.where(pcm >= 32768, pcm - 65536, pcm) >> 3
+    mask = np.where(pcm >= 0, 0xD5, 0x55)
+    pcm = np.where(pcm >= 0, pcm, -pcm - 1)
+    segment = np.searchsorted(_ALAW_SEGMENT_ENDS, pcm)
+    mantissa = np.where(segment < 2, pcm >> 1, pcm >> np.maximum(segment, 1)) & 0x0F
+    code = np.where(segment >= 8, 0x7F, (np.minimum(segment, 7) << 4) | mantissa)
+    return (code ^ mask).astype(np.uint8)
+
+
+# 64 KiB encode tables make companding a single gather per buffer
+_DECODE = {'ulaw': _build_ulaw_decode(), 'alaw': _build_alaw_decode()}
+_ENCODE = {'ulaw': _build_ulaw_encode(), 'alaw': _build_alaw_encode()}
+
+
+def as_pcm16(samples: Samples) -> np.ndarray:
+    """View 16-bit little-endian PCM bytes as int16 samples; arrays pass through"""
+    if isinstance(samples, np.ndarray):
+        return samples.astype(np.int16, copy=False)
+    return np.frombuffer(samples, dtype='<i2')
+
+
+def decode(data: Union[bytes, bytearray, memoryview], codec: str = 'ulaw') -> np.ndarray:
+    """G.711 bytes to int16 samples"""
+    if codec not in CODECS:
+        raise ValueError(f"Unknown codec: {codec}")
+    return _DECODE[codec][np.frombuffer(data, dtype=np.uint8)]
+
+
+def encode(samples: Samples, codec: str = 'ulaw') -> bytes:
+    """int16 samples (or 16-bit PCM bytes) to G.711 bytes"""
+    if codec not in CODECS:
+        raise ValueError(f"Unknown codec: {codec}")
+    return _ENCODE[codec][as_pcm16(samples).view(np.uint16)].tobytes()
+
+
+def _lowpass(taps: int, cutoff: float, gain: float) -> np.ndarray:
+    """Kaiser-windowed sinc; cutoff in cycles per sample"""
+    n = np.arange(taps) - (taps - 1) / 2
+    h = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(taps, 8.0)
+    return h * (gain / h.sum())
+
+
+class Resampler:
+    """
+    Streaming polyphase resampler for integer rate ratios, e.g. 8k <-> 16k
+    Upsampling evaluates each phase of the interpolation filter as one
+    matrix product over the input, so the inserted zeros are never
+    multiplied; downsampling only computes the samples it keeps. Filter
+    history carries across calls, so frames can be fed one at a time.
+    The filter delays the output by `delay` output samples.
+    """
+    
+    def __init__(self, from_rate: int, to_rate: int, taps_per_phase: int = 16):
+        if from_rate <= 0 or to_rate <= 0:
+            raise ValueError("Sample rates must be positive")
+        if to_rate % from_rate and from_rate % to_rate:
+            raise ValueError(f"Only integer rate ratios are supported, not {from_rate}->{to_rate}")
+        
+        self.from_rate = from_rate
+        self.to_rate = to_rate
+        self.up = max(1, to_rate // from_rate)
+        self.down = max(1, from_rate // to_rate)
+        factor = max(self.up, self.down)
+        # Odd symmetric length 2*factor*K - 1 puts the group delay on a whole output sample
+        cutoff = 0.45 / factor
+        if self.up > 1:
+            h = np.append(_lowpass(2 * factor * taps_per_phase - 1, cutoff, self.up), 0.0)
+            # Row p holds phase p's taps, reversed for the sliding-window product
+            self._filter = h.reshape(-1, self.up).T[:, ::-1].T.astype(np.float32)
+            self.delay = factor * taps_per_phase - 1
+        else:
+            h = _lowpass(2 * factor * taps_per_phase + 1, cutoff, 1.0)
+            self._filter = h[::-1].astype(np.float32)
+            self.delay = taps_per_phase if self.down > 1 else 0
+        self.reset()
+    
+    def reset(self):
+        """Forget filter history, e.g. at the start of a new call"""
+        self._history = np.zeros(self._filter.shape[0] - 1, dtype=np.float32)
+        self._phase = 0
+    
+    def process(self, samples: Samples) -> np.ndarray:
+        """Resample the next block of int16 samples"""
+        x = as_pcm16(samples)
+        if self.up == self.down == 1:
+            return x.copy()
+        
+        full = np.concatenate((self._history, x.astype(np.float32)))
+        windows = np.lib.stride_tricks.sliding_window_view(full, self._filter.shape[0])
+        if self._history.size:
+            self._history = full[-self._history.size:]
+        
+        if self.up > 1:
+            y = (windows @ self._filter).ravel()
+        else:
+            y = windows[self._phase::self.down] @ self._filter
+            self._phase = (self._phase - len(x)) % self.down
+        return np.clip(np.rint(y), -32768, 32767).astype(np.int16)
+    
+    def flush(self) -> np.ndarray:
+        """Push the filter's delayed tail out with silence"""
+        input_delay = math.ceil(self.delay * self.down / self.up)
+        return self.process(np.zeros(input_delay, dtype=np.int16))
+
+
+def resample(samples: Samples, from_rate: int, to_rate: int, taps_per_phase: int = 16) -> np.ndarray:
+    """
+    One-shot resampling of a whole signal, aligned with the input
+    The filter delay is trimmed, so the output has len * to_rate / from_rate samples
+    """
+    x = as_pcm16(samples)
+    resampler = Resampler(from_rate, to_rate, taps_per_phase)
+    y = np.concatenate((resampler.process(x), resampler.flush()))
+    length = len(x) * resampler.up // resampler.down if resampler.up > 1 else math.ceil(len(x) / resampler.down)
+    return y[resampler.delay:resampler.delay + length]
+
+
+class AudioConverter:
+    """
+    Stateful telephony -> ASR conversion for one call
+    Decodes G.711 (codec=None means 16-bit PCM already) and resamples, keeping
+    filter history between chunks of the same call
+    """
+    
+    def __init__(self, codec: str = 'ulaw', from_rate: int = 8000, to_rate: int = 16000):
+        if codec is not None and codec not in CODECS:
+            raise ValueError(f"Unknown codec: {codec}")
+        self.codec = codec
+        self.resampler = Resampler(from_rate, to_rate)
+    
+    def reset(self):
+        """Start a new call"""
+        self.resampler.reset()
+    
+    def convert(self, data: Union[bytes, bytearray, memoryview]) -> bytes:
+        """Next chunk of call audio as 16-bit PCM at the target rate"""
+        samples = decode(data, self.codec) if self.codec else as_pcm16(data)
+        return self.resampler.process(samples).astype('<i2').tobytes()
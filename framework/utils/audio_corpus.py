@@ -0,0 +1,226 @@
+"""
+Synthetic telephony audio corpus
+Seeded generators for speech-band audio, tones, DTMF and silence, plus
+clipped and packet-lossy variants. Clips are cached on disk as .npy files
+and opened with numpy memmap, so parallel test workers share one copy
+through the page cache instead of regenerating it.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+import numpy as np
+from loguru import logger
+from framework.utils.audio_codec import encode
+from framework.utils.audio_buffer import frame_views
+
+
+DTMF_FREQUENCIES = {
+    '1': (697, 1209), '2': (697, 1336), '3': (697, 1477), 'A': (697, 1633),
+    '4': (770, 1209), '5': (770, 1336), '6': (770, 1477), 'B': (770, 1633),
+    '7': (852, 1209), '8': (852, 1336), '9': (852, 1477), 'C': (852, 1633),
+    '*': (941, 1209), '0': (941, 1336), '#': (941, 1477), 'D': (941, 1633),
+}
+
+
+def _amplitude(level_db: float) -> float:
+    """Linear amplitude for a level in dBFS"""
+    return 32768.0 * 10 ** (level_db / 20)
+
+
+def _normalize(signal: np.ndarray, level_db: float) -> np.ndarray:
+    """Scale a float signal to an RMS level in dBFS"""
+    rms = np.sqrt(np.mean(signal * signal)) if len(signal) else 0.0
+    return signal * (_amplitude(level_db) / rms) if rms else signal
+
+
+def _band_noise(rng: np.random.Generator, num_samples: int, sample_rate: int,
+                low_hz: float = 300.0, high_hz: float = 3400.0) -> np.ndarray:
+    """White noise band-limited in the frequency domain"""
+    spectrum = np.fft.rfft(rng.standard_normal(num_samples))
+    frequencies = np.fft.rfftfreq(num_samples, 1 / sample_rate)
+    spectrum[(frequencies < low_hz) | (frequencies > high_hz)] = 0
+    return np.fft.irfft(spectrum, num_samples)
+
+
+def silence(rng: np.random.Generator, num_samples: int, sample_rate: int,
+            noise_db: float = -60.0) -> np.ndarray:
+    """Line noise at noise_db dBFS"""
+    return rng.standard_normal(num_samples) * _amplitude(noise_db)
+
+
+def tone(rng: np.random.Generator, num_samples: int, sample_rate: int,
+         frequency_hz: float = 1000.0, level_db: float = -10.0) -> np.ndarray:
+    """Pure tone; level is RMS"""
+    t = np.arange(num_samples) / sample_rate
+    return np.sqrt(2) * _amplitude(level_db) * np.sin(2 * np.pi * frequency_hz * t)
+
+
+def dtmf(rng: np.random.Generator, num_samples: int, sample_rate: int, digits: str = '123456789*0#',
+         tone_ms: int = 100, gap_ms: int = 50, level_db: float = -10.0) -> np.ndarray:
+    """Keypad digits as dual tones separated by gaps, repeated to fill the duration"""
+    tone_samples = sample_rate * tone_ms // 1000
+    period = tone_samples + sample_rate * gap_ms // 1000
+    index = np.arange(num_samples)
+    low, high = np.array([DTMF_FREQUENCIES[d.upper()] for d in digits], dtype=float).T
+    digit = (index // period) % len(digits)
+    t = index / sample_rate
+    # Two sines of peak A have a combined RMS of A, so each burst sits at level_db
+    signal = _amplitude(level_db) * (np.sin(2 * np.pi * low[digit] * t) + np.sin(2 * np.pi * high[digit] * t))
+    return np.where(index % period < tone_samples, signal, 0.0)
+
+
+def speech_like(rng: np.random.Generator, num_samples: int, sample_rate: int,
+                level_db: float = -20.0) -> np.ndarray:
+    """
+    Speech-band audio with a syllable rhythm
+    Voiced segments are a gliding harmonic series below 3.4 kHz, unvoiced ones
+    band-limited noise, each shaped by a raised-cosine syllable envelope
+    """
+    # Pitch drifts smoothly between knots every 200ms
+    knots = rng.uniform(90, 250, num_samples // (sample_rate // 5) + 2)
+    f0 = np.interp(np.arange(num_samples), np.arange(len(knots)) * (sample_rate // 5), knots)
+    phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+    voiced = np.zeros(num_samples)
+    for k in range(1, int(3400 // 90) + 1):
+        voiced += np.where(k * f0 < 3400, np.sin(k * phase) / k, 0.0)
+    unvoiced = _band_noise(rng, num_samples, sample_rate, 2000, 3400)
+    unvoiced *= np.std(voiced) / (np.std(unvoiced) or 1.0)
+    
+    # Syllables of 80-250ms, mostly voiced
+    lengths = rng.integers(sample_rate * 8 // 100, sample_rate // 4, num_samples // (sample_rate * 8 // 100) + 1)
+    starts = np.concatenate(([0], np.cumsum(lengths)))
+    syllable = np.searchsorted(starts, np.arange(num_samples), side='right') - 1
+    position = (np.arange(num_samples) - starts[syllable]) / lengths[syllable]
+    envelope = 0.5 - 0.5 * np.cos(2 * np.pi * position)
+    is_voiced = rng.random(len(lengths)) < 0.75
+    signal = np.where(is_voiced[syllable], voiced, 0.5 * unvoiced) * envelope
+    return _normalize(signal, level_db)
+
+
+def call(rng: np.random.Generator, num_samples: int, sample_rate: int, talk_s: float = 1.5,
+         pause_s: float = 1.0, level_db: float = -20.0, noise_db: float = -60.0) -> np.ndarray:
+    """One side of a conversation: talk spurts and silence runs over line noise"""
+    signal = silence(rng, num_samples, sample_rate, noise_db)
+    speech = speech_like(rng, num_samples, sample_rate, level_db)
+    position = int(rng.exponential(pause_s) * sample_rate)
+    while position < num_samples:
+        end = position + int(rng.exponential(talk_s) * sample_rate)
+        signal[position:end] += speech[position:end]
+        position = end + int(rng.exponential(pause_s) * sample_rate)
+    return signal
+
+
+GENERATORS: Dict[str, Callable[..., np.ndarray]] = {
+    'silence': silence,
+    'tone': tone,
+    'dtmf': dtmf,
+    'speech': speech_like,
+    'call': call,
+}
+
+
+def clip(signal: np.ndarray, clip_db: float) -> np.ndarray:
+    """Hard-clip at a peak level in dBFS, like an overdriven handset"""
+    limit = 32768.0 * 10 ** (clip_db / 20)
+    return np.clip(signal, -limit, limit)
+
+
+def packet_loss(rng: np.random.Generator, signal: np.ndarray, sample_rate: int, loss_rate: float,
+                frame_ms: int = 20) -> np.ndarray:
+    """Zero whole frames at random, like lost RTP packets without concealment"""
+    frame = sample_rate * frame_ms // 1000
+    lost = rng.random(len(signal) // frame + 1) < loss_rate
+    return np.where(np.repeat(lost, frame)[:len(signal)], 0.0, signal)
+
+
+class AudioCorpus:
+    """
+    Seeded, disk-cached test audio
+    A clip is named by its recipe (kind, duration, codec and generator or
+    variant parameters). The first request generates it and writes it
+    atomically to cache_dir; every later request, from any process, maps
+    the cached file read-only. The same seed always gives the same audio,
+    whatever order clips are requested in.
+    """
+    
+    def __init__(self, cache_dir: str = None, sample_rate: int = 8000, seed: int = 0):
+        default_dir = Path(tempfile.gettempdir()) / 'clearcaptions_audio_corpus'
+        self.cache_dir = Path(cache_dir or os.getenv('AUDIO_CORPUS_DIR', default_dir))
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.sample_rate = sample_rate
+        self.seed = seed
+        self._open: Dict[str, np.ndarray] = {}
+        self.stats = {'generated': 0, 'cache_hits': 0, 'bytes_generated': 0}
+    
+    def path(self, kind: str, duration_s: float = 1.0, codec: str = None, **params) -> Path:
+        """Cache file for a recipe"""
+        recipe = {'kind': kind, 'duration_s': duration_s, 'codec': codec,
+                  'sample_rate': self.sample_rate, 'seed': self.seed, **params}
+        key = hashlib.sha1(json.dumps(recipe, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+        return self.cache_dir / f"{kind}_{key}.npy"
+    
+    def get(self, kind: str, duration_s: float = 1.0, codec: str = None, **params) -> np.ndarray:
+        """
+        Read-only memmap of a clip: int16 PCM, or uint8 G.711 with codec
+        Variant parameters clip_db and loss_rate are applied after generation;
+        anything else goes to the generator for kind
+        """
+        if kind not in GENERATORS:
+            raise ValueError(f"Unknown audio kind: {kind}")
+        path = self.path(kind, duration_s, codec, **params)
+        key = str(path)
+        if key in self._open:
+            self.stats['cache_hits'] += 1
+            return self._open[key]
+        
+        if path.exists():
+            self.stats['cache_hits'] += 1
+        else:
+            self._write(path, self._generate(path, kind, duration_s, codec, params))
+        self._open[key] = np.load(path, mmap_mode='r')
+        return self._open[key]
+    
+    def payload(self, kind: str, duration_s: float = 1.0, codec: str = None, **params) -> memoryview:
+        """A clip as bytes-like audio for the clients, without copying it out of the map"""
+        return memoryview(self.get(kind, duration_s, codec, **params)).cast('B')
+    
+    def chunks(self, kind: str, duration_s: float = 1.0, chunk_ms: int = 200, codec: str = None,
+               **params) -> List[memoryview]:
+        """A clip cut into chunk_ms views, e.g. ASR-sized chunks"""
+        bytes_per_ms = self.sample_rate * (1 if codec else 2) // 1000
+        return list(frame_views(self.payload(kind, duration_s, codec, **params), chunk_ms * bytes_per_ms))
+    
+    def _generate(self, path: Path, kind: str, duration_s: float, codec: str,
+                  params: Dict[str, Any]) -> np.ndarray:
+        """Render a recipe with an RNG seeded from the corpus seed and the recipe itself"""
+        params = dict(params)
+        clip_db = params.pop('clip_db', None)
+        loss_rate = params.pop('loss_rate', None)
+        rng = np.random.default_rng([self.seed, int(path.stem.rsplit('_', 1)[1], 16)])
+        
+        signal = GENERATORS[kind](rng, int(duration_s * self.sample_rate), self.sample_rate, **params)
+        if clip_db is not None:
+            signal = clip(signal, clip_db)
+        if loss_rate:
+            signal = packet_loss(rng, signal, self.sample_rate, loss_rate)
+        samples = np.clip(np.rint(signal), -32768, 32767).astype('<i2')
+        if codec:
+            return np.frombuffer(encode(samples, codec), dtype=np.uint8)
+        return samples
+    
+    def _write(self, path: Path, audio: np.ndarray):
+        """Write to a temporary file and rename, so readers never see a partial clip"""
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, audio)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        self.stats['generated'] += 1
+        self.stats['bytes_generated'] += audio.nbytes
+        logger.debug(f"Generated audio clip {path.name}: {audio.nbytes} bytes")
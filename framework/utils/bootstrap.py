@@ -0,0 +1,126 @@
+"""
+Bootstrap confidence intervals for corpus metrics
+Vectorized NumPy resampling over per-utterance values and error/word counts
+"""
+from typing import Dict, Tuple
+import numpy as np
+
+
+def _categories(columns: Tuple[np.ndarray, ...], max_categories: int) -> Tuple[np.ndarray, ...]:
+    """
+    Collapse utterances into weighted categories for multinomial resampling
+    Resampling n utterances with replacement is the same as drawing
+    multinomial counts over the distinct rows, so identical rows (the
+    common case for error/word counts) are merged exactly. Past
+    max_categories distinct rows (e.g. continuous latencies) the rows are
+    sorted and split into max_categories equal-count strata instead.
+    Returns (weights, means, roots): each category's row count, the mean of
+    each column over its rows, and the symmetric square root of the
+    within-category covariance (None for exact categories, whose rows are
+    identical).
+    """
+    n = len(columns[0])
+    order = np.lexsort(columns[::-1])
+    ordered = [column[order] for column in columns]
+    changed = np.zeros(max(n - 1, 0), dtype=bool)
+    for column in ordered:
+        changed |= column[1:] != column[:-1]
+    starts = np.flatnonzero(np.concatenate(([True], changed)))
+    if len(starts) <= max_categories:
+        weights = np.diff(np.append(starts, n))
+        return weights, tuple(column[starts] for column in ordered), None
+    
+    starts = np.unique(np.linspace(0, n, max_categories, endpoint=False).astype(np.int64))
+    weights = np.diff(np.append(starts, n))
+    means = tuple(np.add.reduceat(column, starts) / weights for column in ordered)
+    centered = [column - np.repeat(mean, weights) for column, mean in zip(ordered, means)]
+    covariance = np.empty((len(starts), len(columns), len(columns)))
+    for i, first in enumerate(centered):
+        for j in range(i, len(centered)):
+            covariance[:, i, j] = covariance[:, j, i] = np.add.reduceat(first * centered[j], starts) / weights
+    eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+    scaled = eigenvectors * np.sqrt(np.clip(eigenvalues, 0, None))[:, None, :]
+    return weights, means, scaled @ eigenvectors.transpose(0, 2, 1)
+
+
+def _resample_totals(columns: Tuple[np.ndarray, ...], n_resamples: int, seed=None,
+                     max_categories: int = 4096, batch_cells: int = 2_000_000) -> Tuple[np.ndarray, ...]:
+    """
+    Per-resample sums of each value column
+    Whole rows are resampled as multinomial counts over the categories from
+    _categories, so paired columns stay paired and each resample costs
+    O(max_categories) rather than O(n). Exact categories give the exact
+    bootstrap. For strata the sum of c rows drawn from a stratum is
+    approximated as c times its mean plus normal noise with c times its
+    covariance: the spread between strata is resampled exactly and only
+    the shape within each stratum is approximated. Resamples are drawn in
+    batches of about batch_cells counts to bound memory.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(columns[0])
+    totals = tuple(np.empty(n_resamples) for _ in columns)
+    weights, means, roots = _categories(columns, max_categories)
+    probabilities = weights / n
+    batch_size = max(1, batch_cells // len(weights))
+    
+    for start in range(0, n_resamples, batch_size):
+        size = min(batch_size, n_resamples - start)
+        draws = rng.multinomial(n, probabilities, size=size).astype(np.float64)
+        for total, mean in zip(totals, means):
+            total[start:start + size] = draws @ mean
+        if roots is not None:
+            spread = np.sqrt(draws)
+            for j in range(len(columns)):
+                noise = spread * rng.standard_normal(draws.shape)
+                for k, total in enumerate(totals):
+                    total[start:start + size] += noise @ roots[:, k, j]
+    return totals
+
+
+def _interval(samples: np.ndarray, confidence: float) -> Tuple[float, float]:
+    """Percentile interval of bootstrap samples"""
+    alpha = (1 - confidence) / 2
+    low, high = np.quantile(samples, [alpha, 1 - alpha])
+    return float(low), float(high)
+
+
+def bootstrap_mean_ci(values: np.ndarray, n_resamples: int = 1000, confidence: float = 0.95,
+                      seed: int = None, max_categories: int = 4096) -> Tuple[float, float]:
+    """Percentile bootstrap confidence interval for the mean of values"""
+    values = np.asarray(values, dtype=np.float64)
+    (sums,) = _resample_totals((values,), n_resamples, seed, max_categories)
+    return _interval(sums / len(values), confidence)
+
+
+def bootstrap_ratio_ci(numerators: np.ndarray, denominators: np.ndarray, n_resamples: int = 1000,
+                       confidence: float = 0.95, seed: int = None,
+                       max_categories: int = 4096) -> Tuple[float, float]:
+    """
+    Percentile bootstrap confidence interval for sum(numerators) / sum(denominators)
+    e.g. corpus WER from per-utterance error and reference word counts
+    """
+    numerators = np.asarray(numerators, dtype=np.float64)
+    denominators = np.asarray(denominators, dtype=np.float64)
+    errors, words = _resample_totals((numerators, denominators), n_resamples, seed, max_categories)
+    return _interval(errors / np.maximum(words, 1), confidence)
+
+
+def summary_confidence_intervals(wer: np.ndarray, latency_ms: np.ndarray, word_errors: np.ndarray,
+                                 ref_words: np.ndarray, n_resamples: int = 1000,
+                                 confidence: float = 0.95, seed: int = None) -> Dict[str, any]:
+    """
+    Confidence intervals for the batch_analyze summary metrics
+    avg_accuracy is 1 - avg_wer, so its interval is mirrored rather than resampled
+    Each interval resamples with its own child seed, so their draws are independent
+    """
+    sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    wer_seed, latency_seed, corpus_seed = sequence.spawn(3)
+    wer_low, wer_high = bootstrap_mean_ci(wer, n_resamples, confidence, wer_seed)
+    return {
+        'confidence': confidence,
+        'resamples': n_resamples,
+        'avg_wer': (wer_low, wer_high),
+        'avg_accuracy': (1 - wer_high, 1 - wer_low),
+        'avg_latency_ms': bootstrap_mean_ci(latency_ms, n_resamples, confidence, latency_seed),
+        'corpus_wer': bootstrap_ratio_ci(word_errors, ref_words, n_resamples, confidence, corpus_seed)
+    }
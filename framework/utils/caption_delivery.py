@@ -2,18 +2,21 @@
 Caption delivery system testing
 Tests the flow from ASR output to user display
 """
-import time
 from typing import Dict, Any, List, Optional
 from loguru import logger
 from framework.utils.config_loader import ConfigLoader
+from framework.utils.clock import SystemClock
+from framework.utils.latency_histogram import LatencyHistogram
 
 
 class CaptionDeliveryTester:
     """Tests caption delivery from ASR to user interface"""
     
-    def __init__(self):
+    def __init__(self, clock=None, network=None):
         self.config = ConfigLoader().load_config()
-        self.delivery_times = []
+        self.clock = clock or SystemClock()
+        self.network = network
+        self.delivery_latency = LatencyHistogram()
         self.caption_queue = []
     
     def deliver_caption(self, call_id: str, transcription: str, 
@@ -23,9 +26,16 @@ class CaptionDeliveryTester:
         Returns delivery metrics
         """
         if timestamp is None:
-            timestamp = time.time()
+            timestamp = self.clock.time()
         
-        delivery_start = time.time()
+        attempts = 1
+        
+        # Push over the emulated network; lost messages are retransmitted
+        if self.network is not None:
+            delay, attempts = self.network.send_reliable(len(transcription.encode('utf-8')))
+            self.clock.sleep(delay)
+        
+        delivery_start = self.clock.time()
         
         # Simulate caption delivery to UI
         caption_data = {
@@ -33,11 +43,12 @@ class CaptionDeliveryTester:
             'text': transcription,
             'timestamp': timestamp,
             'delivered_at': delivery_start,
-            'delivery_latency_ms': (delivery_start - timestamp) * 1000
+            'delivery_latency_ms': (delivery_start - timestamp) * 1000,
+            'attempts': attempts
         }
         
         self.caption_queue.append(caption_data)
-        self.delivery_times.append(caption_data['delivery_latency_ms'])
+        self.delivery_latency.record(caption_data['delivery_latency_ms'])
         
         logger.info(f"Caption delivered for call {call_id}: {len(transcription)} chars, "
                    f"latency: {caption_data['delivery_latency_ms']:.2f}ms")
@@ -53,7 +64,7 @@ class CaptionDeliveryTester:
             caption = self.deliver_caption(
                 call_id,
                 trans.get('text', ''),
-                trans.get('timestamp', time.time())
+                trans.get('timestamp', self.clock.time())
             )
             delivered.append(caption)
         
@@ -61,20 +72,17 @@ class CaptionDeliveryTester:
     
     def test_delivery_latency(self, num_captions: int = 100) -> Dict[str, Any]:
         """Test caption delivery latency"""
-        self.delivery_times.clear()
+        self.delivery_latency.reset()
         
         for i in range(num_captions):
             self.deliver_caption(f"test_call_{i}", f"Test caption {i}")
         
-        if not self.delivery_times:
+        if not self.delivery_latency.count:
             return {}
         
         return {
             'total_captions': num_captions,
-            'average_latency_ms': sum(self.delivery_times) / len(self.delivery_times),
-            'min_latency_ms': min(self.delivery_times),
-            'max_latency_ms': max(self.delivery_times),
-            'p95_latency_ms': sorted(self.delivery_times)[int(len(self.delivery_times) * 0.95)]
+            **self.delivery_latency.metrics()
         }
     
     def test_caption_ordering(self, call_id: str, 
@@ -83,7 +91,7 @@ class CaptionDeliveryTester:
         delivered = []
         
         for i, text in enumerate(transcriptions):
-            caption = self.deliver_caption(call_id, text, time.time() + i * 0.1)
+            caption = self.deliver_caption(call_id, text, self.clock.time() + i * 0.1)
             delivered.append(caption)
         
         # Check ordering
@@ -113,13 +121,10 @@ class CaptionDeliveryTester:
     
     def get_delivery_metrics(self) -> Dict[str, Any]:
         """Get overall delivery metrics"""
-        if not self.delivery_times:
+        if not self.delivery_latency.count:
             return {}
         
         return {
-            'total_deliveries': len(self.delivery_times),
-            'average_latency_ms': sum(self.delivery_times) / len(self.delivery_times),
-            'min_latency_ms': min(self.delivery_times),
-            'max_latency_ms': max(self.delivery_times),
-            'p95_latency_ms': sorted(self.delivery_times)[int(len(self.delivery_times) * 0.95)]
+            'total_deliveries': self.delivery_latency.count,
+            **self.delivery_latency.metrics()
         }
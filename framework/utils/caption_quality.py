@@ -4,10 +4,301 @@ Calculates WER, latency, accuracy, and readability metrics
 """
 import time
 import re
-from typing import List, Tuple, Dict
-from jiwer import wer, cer
+import hashlib
+from collections import OrderedDict
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+from typing import Iterable, Iterator, List, Tuple, Dict
+from jiwer import wer, cer, process_words
+from rapidfuzz.distance import Levenshtein
 import numpy as np
 from loguru import logger
+from framework.utils.bootstrap import summary_confidence_intervals
+from framework.utils.edit_distance import TokenInterner, batch_error_counts, bounded_edit_distance
+from framework.utils.edit_distance import error_rates, extend_row, tokenize_words
+
+
+_ONES = ["zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine",
+         "ten", "eleven", "twelve", "thirteen", "fourteen", "fifteen", "sixteen",
+         "seventeen", "eighteen", "nineteen"]
+_TENS = ["", "", "twenty", "thirty", "forty", "fifty", "sixty", "seventy", "eighty", "ninety"]
+_SCALES = [(10 ** 9, "billion"), (10 ** 6, "million"), (1000, "thousand")]
+_ORDINAL_WORDS = {"one": "first", "two": "second", "three": "third", "five": "fifth",
+                  "eight": "eighth", "nine": "ninth", "twelve": "twelfth"}
+
+
+def spell_number(n: int) -> str:
+    """Spell a non-negative integer in words ("two thousand twenty six")"""
+    if n < 20:
+        return _ONES[n]
+    if n < 100:
+        tens, ones = divmod(n, 10)
+        return _TENS[tens] + (f" {_ONES[ones]}" if ones else "")
+    if n < 1000:
+        hundreds, rest = divmod(n, 100)
+        return f"{_ONES[hundreds]} hundred" + (f" {spell_number(rest)}" if rest else "")
+    for scale, name in _SCALES:
+        if n >= scale:
+            major, rest = divmod(n, scale)
+            return f"{spell_number(major)} {name}" + (f" {spell_number(rest)}" if rest else "")
+
+
+def spell_ordinal(n: int) -> str:
+    """Spell a non-negative integer as an ordinal ("fifteenth")"""
+    words = spell_number(n).split(" ")
+    last = words[-1]
+    if last in _ORDINAL_WORDS:
+        words[-1] = _ORDINAL_WORDS[last]
+    elif last.endswith("y"):
+        words[-1] = last[:-1] + "ieth"
+    else:
+        words[-1] = last + "th"
+    return " ".join(words)
+
+
+class TextNormalizer:
+    """
+    Normalizes caption text before WER scoring
+    Lower-cases, expands contractions, spells out numbers, times, ordinals
+    and percentages, and strips punctuation, using regexes and translation
+    tables compiled once per process. Normalized token sequences are
+    memoized in a bounded LRU keyed by a hash of the input text, because
+    the same references are scored against many hypotheses.
+    """
+    
+    CONTRACTIONS = {
+        "won't": "will not", "can't": "can not", "shan't": "shall not", "let's": "let us",
+        "i'm": "i am", "it's": "it is", "that's": "that is", "what's": "what is",
+        "there's": "there is", "here's": "here is", "he's": "he is", "she's": "she is",
+        "who's": "who is", "where's": "where is", "how's": "how is",
+        "n't": " not", "'re": " are", "'ll": " will", "'ve": " have", "'d": " would"
+    }
+    
+    _CONTRACTION = re.compile(
+        r"\b(?:won't|can't|shan't|let's|i'm|it's|that's|what's|there's|here's|he's|she's"
+        r"|who's|where's|how's)\b|(?<=\w)(?:n't|'re|'ll|'ve|'d)\b"
+    )
+    _APOSTROPHES = str.maketrans({"\u2019": "'", "\u2018": "'"})
+    _TIME = re.compile(r"\b(\d{1,2}):(\d{2})\b")
+    _ORDINAL = re.compile(r"\b(\d+)(?:st|nd|rd|th)\b")
+    _PERCENT = re.compile(r"\b(\d+)\s?%")
+    _NUMBER = re.compile(r"\b\d{1,3}(?:,\d{3})+\b|\b\d+\b")
+    # Hyphens and slashes separate words; every other punctuation mark is dropped
+    _PUNCTUATION = str.maketrans({**{c: None for c in "!\"#$%&'()*+,.:;<=>?@[\\]^_`{|}~"},
+                                  "-": " ", "/": " "})
+    
+    def __init__(self, cache_size: int = 100000):
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def __getstate__(self):
+        # The memo is per process; do not ship it to pool workers
+        state = self.__dict__.copy()
+        state['_cache'] = OrderedDict()
+        return state
+    
+    def normalize(self, text: str) -> str:
+        """Return the normalized text, with single spaces between words"""
+        return " ".join(self.tokens(text))
+    
+    def tokens(self, text: str, cache: bool = True) -> Tuple[str, ...]:
+        """
+        Normalized token sequence for text
+        cache=False skips the memo, for one-off text such as hypotheses
+        """
+        if not cache:
+            return self._normalize_tokens(text)
+        
+        key = hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+        tokens = self._cache.get(key)
+        if tokens is not None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return tokens
+        
+        self.misses += 1
+        tokens = self._normalize_tokens(text)
+        self._cache[key] = tokens
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return tokens
+    
+    def _normalize_tokens(self, text: str) -> Tuple[str, ...]:
+        """Run the full normalization pipeline"""
+        text = text.translate(self._APOSTROPHES).lower()
+        text = self._CONTRACTION.sub(lambda m: self.CONTRACTIONS[m.group(0)], text)
+        text = self._TIME.sub(self._spell_time, text)
+        text = self._ORDINAL.sub(lambda m: f" {spell_ordinal(int(m.group(1)))} ", text)
+        text = self._PERCENT.sub(lambda m: f" {spell_number(int(m.group(1)))} percent ", text)
+        text = self._NUMBER.sub(lambda m: f" {spell_number(int(m.group(0).replace(',', '')))} ", text)
+        return tuple(text.translate(self._PUNCTUATION).split())
+    
+    @staticmethod
+    def _spell_time(match) -> str:
+        """Spell a clock time ("2:30" -> "two thirty", "3:00" -> "three o'clock")"""
+        hours, minutes = int(match.group(1)), int(match.group(2))
+        if minutes == 0:
+            return f" {spell_number(hours)} o'clock "
+        if minutes < 10:
+            return f" {spell_number(hours)} oh {spell_number(minutes)} "
+        return f" {spell_number(hours)} {spell_number(minutes)} "
+
+
+class CaptionAlignment:
+    """
+    Word-level alignment of a single (reference, hypothesis) pair
+    The edit-distance DP runs once; WER, accuracy and the S/D/I counts
+    are all derived from that one result. CER is computed on first access.
+    """
+    
+    def __init__(self, reference: str, hypothesis: str):
+        self.reference = reference
+        self.hypothesis = hypothesis
+        
+        output = process_words(reference, hypothesis)
+        self.hits = output.hits
+        self.substitutions = output.substitutions
+        self.deletions = output.deletions
+        self.insertions = output.insertions
+        self.chunks = output.alignments[0]
+        self._cer = None
+    
+    @property
+    def reference_length(self) -> int:
+        """Number of words in the reference (N)"""
+        return self.hits + self.substitutions + self.deletions
+    
+    @property
+    def errors(self) -> int:
+        """Total word edit operations (S + D + I)"""
+        return self.substitutions + self.deletions + self.insertions
+    
+    @property
+    def wer(self) -> float:
+        """Word Error Rate, (S + D + I) / N"""
+        return self.errors / self.reference_length
+    
+    @property
+    def accuracy(self) -> float:
+        """Accuracy as (1 - WER)"""
+        return 1 - self.wer
+    
+    @property
+    def cer(self) -> float:
+        """
+        Character Error Rate, computed lazily and cached
+        Only the character edit distance is needed, not its alignment, so
+        this runs in linear memory as well
+        """
+        if self._cer is None:
+            reference = self.reference.strip()
+            if not reference:
+                raise ValueError("Reference is empty")
+            self._cer = Levenshtein.distance(reference, self.hypothesis.strip()) / len(reference)
+        return self._cer
+
+
+class IncrementalWERScorer:
+    """
+    Running WER of a growing partial hypothesis against a fixed reference
+    One DP column is kept per hypothesis word, so appending a word costs
+    O(N) in the reference length and retracting words just drops columns
+    """
+    
+    def __init__(self, reference: str):
+        self.reference = reference
+        self._interner = TokenInterner()
+        self._reference_ids = self._interner.encode(tokenize_words(reference))
+        self._words: List[str] = []
+        self._columns = [np.arange(len(self._reference_ids) + 1, dtype=np.int32)]
+    
+    @property
+    def words(self) -> List[str]:
+        """Current hypothesis words"""
+        return list(self._words)
+    
+    @property
+    def distance(self) -> int:
+        """Word edit distance between the reference and the current hypothesis"""
+        return int(self._columns[-1][-1])
+    
+    @property
+    def wer(self) -> float:
+        """WER of the current hypothesis (1.0 for an empty reference)"""
+        if len(self._reference_ids) == 0:
+            return 1.0
+        return self.distance / len(self._reference_ids)
+    
+    def append(self, text: str) -> float:
+        """Append words to the hypothesis and return the running WER"""
+        for word in tokenize_words(text):
+            token = self._interner.encode([word])[0]
+            self._columns.append(extend_row(self._columns[-1], self._reference_ids == token,
+                                            len(self._words) + 1))
+            self._words.append(word)
+        return self.wer
+    
+    def retract(self, count: int = 1) -> float:
+        """Remove the last count words from the hypothesis and return the running WER"""
+        count = min(count, len(self._words))
+        if count > 0:
+            del self._words[-count:]
+            del self._columns[-count:]
+        return self.wer
+    
+    def update(self, hypothesis: str) -> float:
+        """
+        Replace the hypothesis with a revised partial
+        Only words after the common prefix with the previous partial are rescored
+        """
+        words = tokenize_words(hypothesis)
+        common = 0
+        for old, new in zip(self._words, words):
+            if old != new:
+                break
+            common += 1
+        
+        self.retract(len(self._words) - common)
+        return self.append(" ".join(words[common:]))
+
+
+class CorpusSummary:
+    """
+    Running aggregate of per-caption results in constant memory
+    to_dict() reports the same fields as the batch_analyze summary
+    """
+    
+    def __init__(self):
+        self.total_tests = 0
+        self.passed = 0
+        self.wer_sum = 0.0
+        self.latency_sum = 0.0
+        self.accuracy_sum = 0.0
+    
+    def add(self, result: Dict[str, any]):
+        """Fold one analyze_caption_quality result into the summary"""
+        self.total_tests += 1
+        self.passed += 1 if result['passed'] else 0
+        self.wer_sum += result['wer']
+        self.latency_sum += result['latency_ms']
+        self.accuracy_sum += result['accuracy']
+    
+    def to_dict(self) -> Dict[str, any]:
+        """Summary statistics for everything added so far"""
+        total = self.total_tests
+        return {
+            'total_tests': total,
+            'passed': self.passed,
+            'failed': total - self.passed,
+            'pass_rate': self.passed / total if total else 0.0,
+            'avg_wer': self.wer_sum / total if total else 0.0,
+            'avg_latency_ms': self.latency_sum / total if total else 0.0,
+            'avg_accuracy': self.accuracy_sum / total if total else 0.0
+        }
 
 
 class CaptionQualityAnalyzer:
@@ -15,10 +306,22 @@ class CaptionQualityAnalyzer:
     
     def __init__(self, wer_threshold: float = 0.05, 
                  latency_threshold_ms: int = 2000,
-                 accuracy_threshold: float = 0.95):
+                 accuracy_threshold: float = 0.95,
+                 normalizer: TextNormalizer = None):
         self.wer_threshold = wer_threshold
         self.latency_threshold_ms = latency_threshold_ms
         self.accuracy_threshold = accuracy_threshold
+        self.normalizer = normalizer
+    
+    def _prepare(self, reference: str, hypothesis: str) -> Tuple[str, str]:
+        """
+        Apply the optional normalizer before scoring
+        Reference tokens are memoized; hypotheses are usually unique and are not
+        """
+        if self.normalizer is None:
+            return reference, hypothesis
+        return (" ".join(self.normalizer.tokens(reference)),
+                " ".join(self.normalizer.tokens(hypothesis, cache=False)))
     
     def calculate_wer(self, reference: str, hypothesis: str) -> float:
         """
@@ -27,7 +330,7 @@ class CaptionQualityAnalyzer:
         where S = substitutions, D = deletions, I = insertions, N = total words
         """
         try:
-            error_rate = wer(reference, hypothesis)
+            error_rate = wer(*self._prepare(reference, hypothesis))
             logger.info(f"WER calculated: {error_rate:.4f}")
             return error_rate
         except Exception as e:
@@ -37,7 +340,7 @@ class CaptionQualityAnalyzer:
     def calculate_cer(self, reference: str, hypothesis: str) -> float:
         """Calculate Character Error Rate (CER)"""
         try:
-            error_rate = cer(reference, hypothesis)
+            error_rate = cer(*self._prepare(reference, hypothesis))
             logger.info(f"CER calculated: {error_rate:.4f}")
             return error_rate
         except Exception as e:
@@ -50,6 +353,16 @@ class CaptionQualityAnalyzer:
         logger.info(f"Latency measured: {latency_ms:.2f}ms")
         return latency_ms
     
+    def align(self, reference: str, hypothesis: str) -> CaptionAlignment:
+        """
+        Align reference and hypothesis once
+        Use the returned alignment when more than one metric is needed
+        jiwer 3 aligns with rapidfuzz's editops, which keep only linear
+        memory in the transcript length, so hour-long call transcripts need
+        no separate alignment path
+        """
+        return CaptionAlignment(*self._prepare(reference, hypothesis))
+    
     def calculate_accuracy(self, reference: str, hypothesis: str) -> float:
         """Calculate accuracy as (1 - WER)"""
         wer_value = self.calculate_wer(reference, hypothesis)
@@ -94,12 +407,26 @@ class CaptionQualityAnalyzer:
         Comprehensive caption quality analysis
         Returns dictionary with all metrics
         """
+        try:
+            alignment = self.align(reference, hypothesis)
+            wer_value = alignment.wer
+            cer_value = alignment.cer
+        except Exception as e:
+            logger.error(f"Error aligning captions: {e}")
+            wer_value, cer_value = 1.0, 1.0  # Worst case
+        
+        return self._result_dict(wer_value, cer_value, latency_ms,
+                                 self.calculate_readability_score(hypothesis))
+    
+    def _result_dict(self, wer_value: float, cer_value: float, latency_ms: float,
+                     readability: float) -> Dict[str, any]:
+        """Per-caption result dict from already computed metrics, with threshold checks"""
         results = {
-            'wer': self.calculate_wer(reference, hypothesis),
-            'cer': self.calculate_cer(reference, hypothesis),
-            'accuracy': self.calculate_accuracy(reference, hypothesis),
+            'wer': wer_value,
+            'cer': cer_value,
+            'accuracy': 1 - wer_value,
             'latency_ms': latency_ms,
-            'readability': self.calculate_readability_score(hypothesis),
+            'readability': readability,
             'passed': True,
             'issues': []
         }
@@ -119,31 +446,276 @@ class CaptionQualityAnalyzer:
         
         return results
     
-    def batch_analyze(self, test_cases: List[Tuple[str, str, float]]) -> Dict[str, any]:
+    def exceeds_wer_threshold(self, reference: str, hypothesis: str,
+                              threshold: float = None) -> bool:
+        """
+        Check WER > threshold without computing the exact WER
+        The bounded edit distance stops as soon as the error budget is spent
+        """
+        threshold = self.wer_threshold if threshold is None else threshold
+        ref, hyp = self._encode_words(reference, hypothesis)
+        n = len(ref)
+        budget = self._error_budget(n, len(hyp), lambda d: d / n <= threshold)
+        return bounded_edit_distance(ref, hyp, budget) is None
+    
+    def gate_caption_quality(self, reference: str, hypothesis: str,
+                             latency_ms: float) -> Dict[str, any]:
+        """
+        Pass/fail gating against the configured thresholds
+        Same checks as analyze_caption_quality, but WER is only bounded, not
+        computed: a single banded DP runs with the larger of the WER and
+        accuracy error budgets and exits early once it is exhausted
+        """
+        ref, hyp = self._encode_words(reference, hypothesis)
+        n = len(ref)
+        wer_budget = self._error_budget(n, len(hyp), lambda d: d / n <= self.wer_threshold)
+        accuracy_budget = self._error_budget(n, len(hyp), lambda d: 1 - d / n >= self.accuracy_threshold)
+        
+        # None means the distance is above both budgets
+        distance = bounded_edit_distance(ref, hyp, max(wer_budget, accuracy_budget))
+        
+        results = {
+            'latency_ms': latency_ms,
+            'passed': True,
+            'issues': []
+        }
+        
+        if distance is None or distance > wer_budget:
+            results['passed'] = False
+            results['issues'].append(f"WER exceeds threshold {self.wer_threshold}")
+        
+        if results['latency_ms'] > self.latency_threshold_ms:
+            results['passed'] = False
+            results['issues'].append(f"Latency {results['latency_ms']:.2f}ms exceeds threshold {self.latency_threshold_ms}ms")
+        
+        if distance is None or distance > accuracy_budget:
+            results['passed'] = False
+            results['issues'].append(f"Accuracy below threshold {self.accuracy_threshold}")
+        
+        return results
+    
+    def _encode_words(self, reference: str, hypothesis: str) -> Tuple[List[str], List[str]]:
+        """Word tokens for both sides of a pair, split like jiwer's WER transform"""
+        reference, hypothesis = self._prepare(reference, hypothesis)
+        return tokenize_words(reference), tokenize_words(hypothesis)
+    
+    @staticmethod
+    def _error_budget(ref_words: int, hyp_words: int, passes) -> int:
+        """
+        Largest edit distance for which passes(distance) holds, -1 if none
+        Found by bisection so the float comparison matches the full analysis
+        """
+        if ref_words == 0 or not passes(0):
+            return -1  # Empty references always score the worst case
+        
+        low, high = 0, max(ref_words, hyp_words)
+        while low < high:
+            mid = (low + high + 1) // 2
+            if passes(mid):
+                low = mid
+            else:
+                high = mid - 1
+        return low
+    
+    def batch_analyze(self, test_cases: List[Tuple[str, str, float]],
+                      bucket_size: int = 512, workers: int = 1,
+                      chunk_size: int = 5000, bootstrap_resamples: int = 0,
+                      confidence: float = 0.95, seed: int = None,
+                      columnar: bool = False, by_category: bool = False) -> Dict[str, any]:
         """
         Analyze multiple caption test cases
-        test_cases: List of (reference, hypothesis, latency_ms) tuples
+        test_cases: List of (reference, hypothesis, latency_ms) tuples, optionally
+        with a fourth category element
+        WER and CER for each chunk come from one vectorized pass
+        workers > 1 shards the cases across a process pool in chunks of
+        chunk_size; results are merged in input order, so the output is
+        identical to the serial path
+        bootstrap_resamples > 0 adds bootstrap confidence intervals for
+        avg_wer, avg_accuracy, avg_latency_ms and corpus-level WER
+        columnar=True returns individual_results as a CaptionQualityResults
+        store instead of a list of dicts
+        by_category=True adds per-category statistics to the summary, each
+        with its own confidence intervals when bootstrapping
+        """
+        if workers > 1 and len(test_cases) > chunk_size:
+            results, counts = self._analyze_parallel(test_cases, bucket_size, workers, chunk_size)
+        else:
+            results, counts = self._score_cases(test_cases, bucket_size)
+        
+        summary = results.summary()
+        if bootstrap_resamples > 0:
+            summary['confidence_intervals'] = summary_confidence_intervals(
+                results.wer, results.latency_ms,
+                counts['word_errors'], counts['ref_words'],
+                bootstrap_resamples, confidence, seed
+            )
+        if by_category:
+            summary['by_category'] = results.group_by_category()
+            if bootstrap_resamples > 0:
+                category_seeds = np.random.SeedSequence(seed).spawn(len(results.category_names))
+                for code, name in enumerate(results.category_names):
+                    rows = results.category_codes == code
+                    summary['by_category'][name]['confidence_intervals'] = summary_confidence_intervals(
+                        results.wer[rows], results.latency_ms[rows],
+                        counts['word_errors'][rows], counts['ref_words'][rows],
+                        bootstrap_resamples, confidence, category_seeds[code]
+                    )
+        
+        return {
+            'individual_results': results if columnar else results.to_dicts(),
+            'summary': summary
+        }
+    
+    def iter_analyze(self, test_cases: Iterable[Tuple[str, str, float]],
+                     chunk_size: int = 1000, bucket_size: int = 512) -> Iterator[Dict[str, any]]:
         """
-        results = []
-        for reference, hypothesis, latency_ms in test_cases:
-            result = self.analyze_caption_quality(reference, hypothesis, latency_ms)
-            results.append(result)
+        Analyze a stream of test cases of any length in constant memory
+        Cases are pulled chunk_size at a time, scored with the vectorized
+        engine, and yielded one result at a time in input order
+        """
+        cases = iter(test_cases)
+        while True:
+            chunk = list(islice(cases, chunk_size))
+            if not chunk:
+                return
+            yield from self._score_cases(chunk, bucket_size)[0]
+    
+    def _score_cases(self, test_cases: List[Tuple[str, str, float]],
+                     bucket_size: int = 512) -> Tuple['CaptionQualityResults', Dict[str, np.ndarray]]:
+        """Columnar results for one chunk, plus the raw error and word counts"""
+        pairs = [self._prepare(case[0], case[1]) for case in test_cases]
+        counts = batch_error_counts([pair[0] for pair in pairs],
+                                    [pair[1] for pair in pairs],
+                                    bucket_size)
+        
+        results = CaptionQualityResults(
+            self,
+            wer=error_rates(counts['word_errors'], counts['ref_words']),
+            cer=error_rates(counts['char_errors'], counts['ref_chars']),
+            latency_ms=[case[2] for case in test_cases],
+            readability=[self.calculate_readability_score(case[1]) for case in test_cases],
+            categories=[case[3] if len(case) > 3 else 'general' for case in test_cases]
+        )
+        return results, counts
+    
+    def _analyze_parallel(self, test_cases: List[Tuple[str, str, float]], bucket_size: int,
+                          workers: int, chunk_size: int) -> Tuple['CaptionQualityResults', Dict[str, np.ndarray]]:
+        """Score chunks in a process pool and merge them back in input order"""
+        chunks = [test_cases[start:start + chunk_size]
+                  for start in range(0, len(test_cases), chunk_size)]
+        logger.info(f"Scoring {len(test_cases)} captions in {len(chunks)} chunks "
+                   f"across {workers} workers")
+        
+        parts = []
+        chunk_counts = []
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # map() yields chunk results in submission order
+            for chunk_results, counts in executor.map(partial(self._score_cases, bucket_size=bucket_size),
+                                                      chunks):
+                parts.append(chunk_results)
+                chunk_counts.append(counts)
         
-        # Aggregate statistics
-        avg_wer = np.mean([r['wer'] for r in results])
-        avg_latency = np.mean([r['latency_ms'] for r in results])
-        avg_accuracy = np.mean([r['accuracy'] for r in results])
-        pass_rate = sum(1 for r in results if r['passed']) / len(results)
+        counts = {key: np.concatenate([c[key] for c in chunk_counts]) for key in chunk_counts[0]}
+        return CaptionQualityResults.concatenate(parts), counts
+
+
+class CaptionQualityResults(Sequence):
+    """
+    Columnar per-caption results from batch analysis
+    Metrics live in NumPy arrays and categories are interned as integer
+    codes; the per-caption dicts returned by analyze_caption_quality are
+    only built when an item is accessed.
+    """
+    
+    def __init__(self, analyzer: CaptionQualityAnalyzer, wer, cer, latency_ms,
+                 readability, categories=None):
+        self.analyzer = analyzer
+        self.wer = np.asarray(wer, dtype=np.float64)
+        self.cer = np.asarray(cer, dtype=np.float64)
+        self.accuracy = 1 - self.wer
+        self.latency_ms = np.asarray(latency_ms, dtype=np.float64)
+        self.readability = np.asarray(readability, dtype=np.float64)
+        self.passed = ((self.wer <= analyzer.wer_threshold)
+                       & (self.latency_ms <= analyzer.latency_threshold_ms)
+                       & (self.accuracy >= analyzer.accuracy_threshold))
+        
+        codes = {}
+        categories = categories if categories is not None else ['general'] * len(self.wer)
+        self.category_codes = np.fromiter((codes.setdefault(c, len(codes)) for c in categories),
+                                          dtype=np.int32, count=len(self.wer))
+        self.category_names = list(codes)
+    
+    def __len__(self) -> int:
+        return len(self.wer)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("result index out of range")
+        
+        result = self.analyzer._result_dict(float(self.wer[index]), float(self.cer[index]),
+                                            float(self.latency_ms[index]),
+                                            float(self.readability[index]))
+        result['category'] = self.category_names[self.category_codes[index]]
+        return result
+    
+    def to_dicts(self) -> List[Dict[str, any]]:
+        """Materialize every per-caption dict"""
+        return [self[i] for i in range(len(self))]
+    
+    def summary(self) -> Dict[str, any]:
+        """Aggregate statistics, as reported in the batch_analyze summary"""
+        total = len(self)
+        passed = int(np.count_nonzero(self.passed))
+        return {
+            'total_tests': total,
+            'passed': passed,
+            'failed': total - passed,
+            'pass_rate': passed / total,
+            'avg_wer': np.mean(self.wer),
+            'avg_latency_ms': np.mean(self.latency_ms),
+            'avg_accuracy': np.mean(self.accuracy)
+        }
+    
+    def group_by_category(self) -> Dict[str, Dict[str, any]]:
+        """Summary statistics per category, computed with bincount over the category codes"""
+        groups = len(self.category_names)
+        totals = np.bincount(self.category_codes, minlength=groups)
+        passed = np.bincount(self.category_codes, weights=self.passed, minlength=groups)
+        wer_sums = np.bincount(self.category_codes, weights=self.wer, minlength=groups)
+        latency_sums = np.bincount(self.category_codes, weights=self.latency_ms, minlength=groups)
+        accuracy_sums = np.bincount(self.category_codes, weights=self.accuracy, minlength=groups)
         
         return {
-            'individual_results': results,
-            'summary': {
-                'total_tests': len(results),
-                'passed': sum(1 for r in results if r['passed']),
-                'failed': sum(1 for r in results if not r['passed']),
-                'pass_rate': pass_rate,
-                'avg_wer': avg_wer,
-                'avg_latency_ms': avg_latency,
-                'avg_accuracy': avg_accuracy
+            name: {
+                'total_tests': int(totals[code]),
+                'passed': int(passed[code]),
+                'failed': int(totals[code] - passed[code]),
+                'pass_rate': passed[code] / totals[code],
+                'avg_wer': wer_sums[code] / totals[code],
+                'avg_latency_ms': latency_sums[code] / totals[code],
+                'avg_accuracy': accuracy_sums[code] / totals[code]
             }
+            for code, name in enumerate(self.category_names)
         }
+    
+    @classmethod
+    def concatenate(cls, parts: List['CaptionQualityResults']) -> 'CaptionQualityResults':
+        """Merge result stores in order, re-interning their category codes"""
+        merged = cls.__new__(cls)
+        merged.analyzer = parts[0].analyzer
+        for column in ('wer', 'cer', 'accuracy', 'latency_ms', 'readability', 'passed'):
+            setattr(merged, column, np.concatenate([getattr(part, column) for part in parts]))
+        
+        codes = {}
+        remapped = []
+        for part in parts:
+            lookup = np.array([codes.setdefault(name, len(codes)) for name in part.category_names],
+                              dtype=np.int32)
+            remapped.append(lookup[part.category_codes])
+        merged.category_codes = np.concatenate(remapped)
+        merged.category_names = list(codes)
+        return merged
@@ -0,0 +1,267 @@
+"""
+Concurrent captioning pipeline harness
+Runs calls through telephony -> ASR -> delivery stages connected by bounded
+queues, with a worker pool per stage
+"""
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+from loguru import logger
+from framework.utils.latency_histogram import LatencyHistogram
+
+
+_STOP = object()
+
+
+class PipelineStage:
+    """One pipeline stage: a handler run by a pool of worker threads"""
+    
+    def __init__(self, name: str, handler: Callable, workers: int = 1, queue_size: int = 16,
+                 worker_state: Callable[[], Any] = None):
+        """
+        handler: called as handler(item), or handler(state, item) when
+        worker_state is given; worker_state is called once per worker thread,
+        e.g. to give each worker its own client
+        """
+        if workers < 1:
+            raise ValueError("A stage needs at least one worker")
+        
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.worker_state = worker_state
+        self.inbox = queue.Queue(maxsize=queue_size)
+        self.service_time = LatencyHistogram()
+        self.processed = 0
+        self.errors = 0
+        self.backpressure_waits = 0
+        self.max_queue_depth = 0
+        self._depth_total = 0
+        self._depth_samples = 0
+        self._running = workers
+        self._lock = threading.Lock()
+    
+    def put(self, envelope: Dict[str, Any]):
+        """Enqueue an item, blocking while the stage is full (backpressure)"""
+        try:
+            self.inbox.put_nowait(envelope)
+        except queue.Full:
+            with self._lock:
+                self.backpressure_waits += 1
+            self.inbox.put(envelope)
+    
+    def sample_depth(self):
+        """Record the current queue depth"""
+        depth = self.inbox.qsize()
+        with self._lock:
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+            self._depth_total += depth
+            self._depth_samples += 1
+    
+    def record(self, service_ms: float, failed: bool):
+        """Record one handled item"""
+        with self._lock:
+            self.service_time.record(service_ms)
+            self.processed += 1
+            self.errors += failed
+    
+    def worker_exited(self) -> bool:
+        """Count a worker as stopped; True for the last one"""
+        with self._lock:
+            self._running -= 1
+            return self._running == 0
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Queue depth, service time and error counts for this stage"""
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'processed': self.processed,
+                'errors': self.errors,
+                'backpressure_waits': self.backpressure_waits,
+                'max_queue_depth': self.max_queue_depth,
+                'avg_queue_depth': self._depth_total / self._depth_samples if self._depth_samples else 0.0,
+                'service_time': self.service_time.metrics()
+            }
+
+
+class CaptioningPipeline:
+    """
+    Multi-stage pipeline with bounded queues and per-stage worker pools
+    submit() blocks when the first stage is full, and each stage blocks on
+    the next, so a slow stage throttles everything upstream instead of
+    letting queues grow. An item whose handler raises is recorded as failed
+    and skips the remaining stages.
+    """
+    
+    def __init__(self, queue_size: int = 16):
+        self.queue_size = queue_size
+        self.stages: List[PipelineStage] = []
+        self.results: List[Dict[str, Any]] = []
+        self.end_to_end = LatencyHistogram()
+        self._threads: List[threading.Thread] = []
+        self._results_lock = threading.Lock()
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+    
+    def add_stage(self, name: str, handler: Callable, workers: int = 1, queue_size: int = None,
+                  worker_state: Callable[[], Any] = None) -> 'CaptioningPipeline':
+        """Append a stage; returns the pipeline for chaining"""
+        if self._threads:
+            raise RuntimeError("Cannot add stages to a running pipeline")
+        self.stages.append(PipelineStage(name, handler, workers, queue_size or self.queue_size,
+                                         worker_state))
+        return self
+    
+    def start(self):
+        """Start every stage's worker threads"""
+        if not self.stages:
+            raise RuntimeError("Pipeline has no stages")
+        
+        self._started_at = time.perf_counter()
+        for index, stage in enumerate(self.stages):
+            downstream = self.stages[index + 1] if index + 1 < len(self.stages) else None
+            for worker in range(stage.workers):
+                thread = threading.Thread(target=self._work, args=(stage, downstream),
+                                          name=f"{stage.name}-{worker}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        
+        layout = " -> ".join(f"{stage.name} x{stage.workers}" for stage in self.stages)
+        logger.info(f"Pipeline started: {layout}")
+    
+    def submit(self, item: Any):
+        """Feed an item into the first stage, blocking while it is full"""
+        self.stages[0].put({'item': item, 'submitted_at': time.perf_counter(),
+                            'stage_times_ms': {}, 'error': None})
+    
+    def close(self, timeout: float = None) -> List[Dict[str, Any]]:
+        """Stop accepting items, wait for the pipeline to drain and return the results"""
+        first = self.stages[0]
+        for _ in range(first.workers):
+            first.inbox.put(_STOP)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._finished_at = time.perf_counter()
+        return self.results
+    
+    def run(self, items) -> List[Dict[str, Any]]:
+        """Start, push every item through and wait for completion"""
+        self.start()
+        for item in items:
+            self.submit(item)
+        return self.close()
+    
+    def _work(self, stage: PipelineStage, downstream: Optional[PipelineStage]):
+        """
+        Worker loop for one thread of a stage
+        If worker_state raises, the worker still drains its share of the
+        inbox, failing each item with the setup error, so upstream never
+        blocks on a stage with no live workers.
+        """
+        try:
+            state, setup_error = None, None
+            if stage.worker_state:
+                try:
+                    state = stage.worker_state()
+                except Exception as e:
+                    setup_error = f"{stage.name}: worker setup failed: {e}"
+                    logger.warning(f"Pipeline stage {stage.name} worker setup failed: {e}")
+            
+            while True:
+                envelope = stage.inbox.get()
+                if envelope is _STOP:
+                    break
+                stage.sample_depth()
+                
+                start = time.perf_counter()
+                try:
+                    if setup_error:
+                        envelope['error'] = setup_error
+                    elif stage.worker_state:
+                        envelope['item'] = stage.handler(state, envelope['item'])
+                    else:
+                        envelope['item'] = stage.handler(envelope['item'])
+                except Exception as e:
+                    envelope['error'] = f"{stage.name}: {e}"
+                    logger.warning(f"Pipeline stage {stage.name} failed: {e}")
+                service_ms = (time.perf_counter() - start) * 1000
+                envelope['stage_times_ms'][stage.name] = service_ms
+                stage.record(service_ms, envelope['error'] is not None)
+                
+                if downstream is not None and envelope['error'] is None:
+                    downstream.put(envelope)
+                else:
+                    self._finish(envelope)
+        finally:
+            # The last worker out passes the shutdown on to the next stage
+            if stage.worker_exited() and downstream is not None:
+                for _ in range(downstream.workers):
+                    downstream.inbox.put(_STOP)
+    
+    def _finish(self, envelope: Dict[str, Any]):
+        """Record a completed or failed item"""
+        latency_ms = (time.perf_counter() - envelope['submitted_at']) * 1000
+        result = {
+            'item': envelope['item'],
+            'error': envelope['error'],
+            'latency_ms': latency_ms,
+            'stage_times_ms': envelope['stage_times_ms']
+        }
+        with self._results_lock:
+            if envelope['error'] is None:
+                self.end_to_end.record(latency_ms)
+            self.results.append(result)
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Throughput, end-to-end latency and per-stage statistics"""
+        end = self._finished_at or time.perf_counter()
+        elapsed = end - self._started_at if self._started_at else 0.0
+        with self._results_lock:
+            completed = sum(1 for r in self.results if r['error'] is None)
+            failed = len(self.results) - completed
+            end_to_end = self.end_to_end.metrics()
+        
+        return {
+            'completed': completed,
+            'failed': failed,
+            'elapsed_s': elapsed,
+            'throughput_per_s': completed / elapsed if elapsed else 0.0,
+            'end_to_end': end_to_end,
+            'stages': {stage.name: stage.get_metrics() for stage in self.stages}
+        }
+
+
+def build_captioning_pipeline(telephony, asr_factory: Callable, delivery, telephony_workers: int = 2,
+                              asr_workers: int = 4, delivery_workers: int = 1,
+                              queue_size: int = 16) -> CaptioningPipeline:
+    """
+    Pipeline for simultaneous calls: answer and stream audio, transcribe, deliver
+    Items are dicts with call_id, audio and reference, and optionally
+    sample_width (1 for G.711 audio, default 16-bit PCM). Each ASR worker gets
+    its own client from asr_factory, since a client holds one session.
+    The delivery tester keeps shared metrics, so it runs on one worker by default.
+    """
+    def connect(call: Dict[str, Any]) -> Dict[str, Any]:
+        telephony.answer_call(call['call_id'])
+        if not telephony.send_audio_stream(call['call_id'], call['audio'],
+                                           sample_width=call.get('sample_width', 2)):
+            raise ConnectionError(f"Audio stream failed for call {call['call_id']}")
+        return call
+    
+    def transcribe(asr, call: Dict[str, Any]) -> Dict[str, Any]:
+        asr.start_session(call['call_id'])
+        call['asr_result'] = asr.process_audio(call['audio'], call.get('reference'))
+        return call
+    
+    def deliver(call: Dict[str, Any]) -> Dict[str, Any]:
+        call['caption'] = delivery.deliver_caption(call['call_id'],
+                                                   call['asr_result']['transcription'])
+        return call
+    
+    pipeline = CaptioningPipeline(queue_size=queue_size)
+    pipeline.add_stage('telephony', connect, telephony_workers)
+    pipeline.add_stage('asr', transcribe, asr_workers, worker_state=asr_factory)
+    pipeline.add_stage('delivery', deliver, delivery_workers)
+    return pipeline
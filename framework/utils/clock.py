@@ -0,0 +1,118 @@
+"""
+Clocks for the test clients
+SystemClock reads wall time; VirtualClock is a discrete-event clock whose
+delays and timeouts advance instantly and deterministically
+"""
+import heapq
+import itertools
+import threading
+import time
+from typing import Any, Callable, List, Tuple
+
+
+class SystemClock:
+    """Real wall-clock time"""
+    
+    def time(self) -> float:
+        """Current time in seconds since the epoch"""
+        return time.time()
+    
+    def monotonic_ns(self) -> int:
+        """High-resolution monotonic timestamp for measuring intervals"""
+        return time.perf_counter_ns()
+    
+    def sleep(self, seconds: float):
+        """Block for the given number of seconds"""
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+class ScheduledEvent:
+    """Handle for a callback scheduled on a VirtualClock"""
+    
+    def __init__(self, when: float, callback: Callable, args: Tuple[Any, ...]):
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+    
+    def cancel(self):
+        """Prevent the callback from running"""
+        self.cancelled = True
+
+
+class VirtualClock:
+    """
+    Discrete-event simulated clock
+    Time only moves through sleep() and advance(). Scheduled callbacks run in
+    time order (ties in scheduling order) as the clock passes them, with the
+    clock set to each event's time while its callback runs.
+    """
+    
+    def __init__(self, start: float = 0.0):
+        self._now = float(start)
+        self._events: List[Tuple[float, int, ScheduledEvent]] = []
+        self._sequence = itertools.count()
+        self._lock = threading.RLock()
+    
+    def time(self) -> float:
+        """Current simulated time in seconds"""
+        return self._now
+    
+    def monotonic_ns(self) -> int:
+        """Current simulated time in nanoseconds"""
+        return round(self._now * 1e9)
+    
+    def sleep(self, seconds: float):
+        """Advance simulated time instead of blocking"""
+        self.advance(seconds)
+    
+    def call_at(self, when: float, callback: Callable, *args) -> ScheduledEvent:
+        """Schedule callback(*args) at an absolute simulated time"""
+        event = ScheduledEvent(max(when, self._now), callback, args)
+        with self._lock:
+            heapq.heappush(self._events, (event.when, next(self._sequence), event))
+        return event
+    
+    def call_later(self, delay: float, callback: Callable, *args) -> ScheduledEvent:
+        """Schedule callback(*args) after a simulated delay, e.g. a timeout"""
+        return self.call_at(self._now + delay, callback, *args)
+    
+    def advance(self, seconds: float) -> int:
+        """
+        Move time forward, running every event that falls due on the way
+        Returns the number of callbacks run
+        """
+        if seconds < 0:
+            raise ValueError("Cannot move a clock backwards")
+        return self._run_until(self._now + seconds)
+    
+    def run_until_idle(self) -> int:
+        """Run every pending event, including those scheduled by callbacks"""
+        ran = 0
+        while True:
+            with self._lock:
+                if not self._events:
+                    return ran
+                target = max(when for when, _, _ in self._events)
+            ran += self._run_until(target)
+    
+    @property
+    def pending(self) -> int:
+        """Number of scheduled events that have not run or been cancelled"""
+        with self._lock:
+            return sum(1 for _, _, event in self._events if not event.cancelled)
+    
+    def _run_until(self, target: float) -> int:
+        """Run events due at or before target, then set the time to target"""
+        ran = 0
+        while True:
+            with self._lock:
+                if not self._events or self._events[0][0] > target:
+                    self._now = max(self._now, target)
+                    return ran
+                when, _, event = heapq.heappop(self._events)
+                self._now = max(self._now, when)
+            if not event.cancelled:
+                event.callback(*event.args)
+                ran += 1
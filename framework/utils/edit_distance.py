@@ -0,0 +1,158 @@
+"""
+Edit distance engines for caption scoring
+NumPy implementations of the Levenshtein DP behind WER and CER, plus a
+rapidfuzz-backed bounded distance for threshold gating
+"""
+import re
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from rapidfuzz.distance import Levenshtein
+
+
+_MULTIPLE_SPACES = re.compile(r"\s\s+")
+
+
+def tokenize_words(text: str) -> List[str]:
+    """Split text into words exactly like jiwer's default WER transform"""
+    return [w for w in _MULTIPLE_SPACES.sub(" ", text).strip().split(" ") if w]
+
+
+def encode_chars(text: str) -> np.ndarray:
+    """Encode text as code points exactly like jiwer's default CER transform"""
+    return np.frombuffer(text.strip().encode('utf-32-le'), dtype=np.uint32).astype(np.int32)
+
+
+class TokenInterner:
+    """Maps word tokens to dense integer ids shared by a whole batch"""
+    
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+    
+    def encode(self, tokens: Sequence[str]) -> np.ndarray:
+        """Return the integer id array for a token sequence"""
+        ids = self.ids
+        return np.fromiter((ids.setdefault(t, len(ids)) for t in tokens),
+                           dtype=np.int32, count=len(tokens))
+
+
+def extend_row(prev: np.ndarray, matches: np.ndarray, index: int) -> np.ndarray:
+    """
+    One Levenshtein DP step for a single pair
+    prev: (L + 1,) DP vector for the previous token, matches: (L,) equality of
+    the new token against the other sequence, index: position of the new token
+    """
+    row = np.empty_like(prev)
+    row[0] = index
+    np.minimum(prev[1:] + 1, prev[:-1] + 1 - matches, out=row[1:])
+    offsets = np.arange(len(prev), dtype=prev.dtype)
+    row -= offsets
+    np.minimum.accumulate(row, out=row)
+    row += offsets
+    return row
+
+
+def _bucket_distances(refs: Sequence[np.ndarray], hyps: Sequence[np.ndarray]) -> np.ndarray:
+    """Edit distances for one bucket of similarly sized pairs"""
+    size = len(refs)
+    ref_lens = np.fromiter((len(r) for r in refs), dtype=np.int64, count=size)
+    hyp_lens = np.fromiter((len(h) for h in hyps), dtype=np.int64, count=size)
+    max_ref = int(ref_lens.max())
+    max_hyp = int(hyp_lens.max())
+    
+    # Padding values never match each other, and padded cells never feed
+    # the cell read back for a pair, so they do not affect any result
+    ref_matrix = np.full((size, max_ref), -1, dtype=np.int32)
+    hyp_matrix = np.full((size, max_hyp), -2, dtype=np.int32)
+    for k in range(size):
+        ref_matrix[k, :ref_lens[k]] = refs[k]
+        hyp_matrix[k, :hyp_lens[k]] = hyps[k]
+    
+    # Rows are stored diagonally shifted, shifted[j] = row[j] - j, which
+    # turns the insertion chain into a plain running minimum and lets every
+    # update happen in place on small integers
+    dtype = np.int16 if max(max_ref, max_hyp) < np.iinfo(np.int16).max else np.int32
+    shifted = np.zeros((size, max_hyp + 1), dtype=dtype)
+    diagonal = np.empty((size, max_hyp), dtype=dtype)
+    matches = np.empty((size, max_hyp), dtype=bool)
+    
+    rows = np.arange(size)
+    distances = hyp_lens.copy()  # Pairs with an empty reference
+    for i in range(1, max_ref + 1):
+        np.equal(hyp_matrix, ref_matrix[:, i - 1:i], out=matches)
+        np.subtract(shifted[:, :-1], matches, out=diagonal)
+        shifted[:, 1:] += 1
+        np.minimum(shifted[:, 1:], diagonal, out=shifted[:, 1:])
+        shifted[:, 0] = i
+        np.minimum.accumulate(shifted, axis=1, out=shifted)
+        
+        done = ref_lens == i
+        if done.any():
+            distances[done] = shifted[rows[done], hyp_lens[done]] + hyp_lens[done]
+    
+    return distances
+
+
+def batch_edit_distance(refs: Sequence[np.ndarray], hyps: Sequence[np.ndarray],
+                        bucket_size: int = 512) -> np.ndarray:
+    """
+    Levenshtein distances for many (reference, hypothesis) token arrays
+    Pairs are sorted by length and scored in buckets, so short utterances
+    are only padded to the longest utterance in their own bucket
+    """
+    count = len(refs)
+    distances = np.zeros(count, dtype=np.int64)
+    if count == 0:
+        return distances
+    
+    ref_lens = np.fromiter((len(r) for r in refs), dtype=np.int64, count=count)
+    hyp_lens = np.fromiter((len(h) for h in hyps), dtype=np.int64, count=count)
+    order = np.lexsort((hyp_lens, ref_lens))
+    
+    for start in range(0, count, bucket_size):
+        bucket = order[start:start + bucket_size]
+        distances[bucket] = _bucket_distances([refs[k] for k in bucket],
+                                              [hyps[k] for k in bucket])
+    
+    return distances
+
+
+def batch_error_counts(references: Sequence[str], hypotheses: Sequence[str],
+                       bucket_size: int = 512) -> Dict[str, np.ndarray]:
+    """
+    Word and character error counts for many pairs in one vectorized pass
+    Returns arrays of word_errors, ref_words, char_errors and ref_chars
+    """
+    interner = TokenInterner()
+    ref_words = [interner.encode(tokenize_words(r)) for r in references]
+    hyp_words = [interner.encode(tokenize_words(h)) for h in hypotheses]
+    ref_chars = [encode_chars(r) for r in references]
+    hyp_chars = [encode_chars(h) for h in hypotheses]
+    
+    return {
+        'word_errors': batch_edit_distance(ref_words, hyp_words, bucket_size),
+        'ref_words': np.fromiter((len(r) for r in ref_words), dtype=np.int64, count=len(ref_words)),
+        'char_errors': batch_edit_distance(ref_chars, hyp_chars, bucket_size),
+        'ref_chars': np.fromiter((len(r) for r in ref_chars), dtype=np.int64, count=len(ref_chars))
+    }
+
+
+def error_rates(errors: np.ndarray, totals: np.ndarray) -> np.ndarray:
+    """Per-pair error rates; pairs with an empty reference score the worst case 1.0"""
+    rates = np.ones(len(errors), dtype=np.float64)
+    scored = totals > 0
+    rates[scored] = errors[scored] / totals[scored]
+    return rates
+
+
+def bounded_edit_distance(ref: Sequence, hyp: Sequence, max_distance: int) -> Optional[int]:
+    """
+    Levenshtein distance restricted to an error budget
+    rapidfuzz's score_cutoff confines the DP to the band |i - j| <= max_distance
+    and stops once the budget is spent. Returns None when the distance is
+    above the budget, otherwise the exact distance.
+    """
+    if max_distance < 0 or abs(len(ref) - len(hyp)) > max_distance:
+        return None
+    distance = Levenshtein.distance(ref, hyp, score_cutoff=max_distance)
+    return distance if distance <= max_distance else None
+
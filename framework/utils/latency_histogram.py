@@ -0,0 +1,141 @@
+"""
+Latency histogram for streaming percentile metrics
+HDR-style log-linear buckets with O(1) record and bounded memory
+"""
+import math
+from typing import Dict, List, Sequence
+
+
+class LatencyHistogram:
+    """
+    Records latency samples in milliseconds into log-linear buckets
+    Each power-of-two range is split into equal sub-buckets, so any recorded
+    value is reproduced within a relative error set by significant_figures.
+    Memory depends only on the configured range, not on the sample count.
+    Min, max, mean and count are tracked exactly.
+    """
+    
+    def __init__(self, significant_figures: int = 2, resolution_ms: float = 0.001,
+                 max_latency_ms: float = 3600000.0):
+        if not 1 <= significant_figures <= 5:
+            raise ValueError("significant_figures must be between 1 and 5")
+        
+        self.significant_figures = significant_figures
+        self.resolution_ms = resolution_ms
+        self.max_latency_ms = max_latency_ms
+        
+        # Smallest power of two giving the requested precision, e.g. 2 -> 256
+        self._sub_bits = math.ceil(math.log2(2 * 10 ** significant_figures))
+        self._half_count = 1 << (self._sub_bits - 1)
+        self._max_units = max(1, int(max_latency_ms / resolution_ms))
+        self._counts: List[int] = [0] * (self._index(self._max_units) + 1)
+        self.reset()
+    
+    def reset(self):
+        """Discard all recorded samples"""
+        self._counts = [0] * len(self._counts)
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms = math.inf
+        self.max_ms = -math.inf
+    
+    def _index(self, units: int) -> int:
+        """Bucket index for a value in resolution units"""
+        bucket = max(0, units.bit_length() - self._sub_bits)
+        return bucket * self._half_count + (units >> bucket)
+    
+    def _value(self, index: int) -> float:
+        """Midpoint in milliseconds of the values sharing a bucket index"""
+        bucket = max(0, (index >> (self._sub_bits - 1)) - 1)
+        low = (index - bucket * self._half_count) << bucket
+        return (low + ((1 << bucket) - 1) / 2) * self.resolution_ms
+    
+    def record(self, latency_ms: float, count: int = 1):
+        """Record a latency sample, optionally with a repeat count"""
+        units = min(max(int(latency_ms / self.resolution_ms), 0), self._max_units)
+        self._counts[self._index(units)] += count
+        self.count += count
+        self.total_ms += latency_ms * count
+        self.min_ms = min(self.min_ms, latency_ms)
+        self.max_ms = max(self.max_ms, latency_ms)
+    
+    def record_corrected(self, latency_ms: float, expected_interval_ms: float, count: int = 1):
+        """
+        Record a closed-loop sample, back-filling the requests a stall held up
+        As in HdrHistogram: with requests expected every expected_interval_ms,
+        a latency L also records L - I, L - 2I, ... while they exceed I
+        """
+        self.record(latency_ms, count)
+        if expected_interval_ms <= 0:
+            return
+        missed = latency_ms - expected_interval_ms
+        while missed >= expected_interval_ms:
+            self.record(missed, count)
+            missed -= expected_interval_ms
+    
+    def merge(self, other: 'LatencyHistogram') -> 'LatencyHistogram':
+        """Add the samples of another histogram with the same configuration"""
+        if len(other._counts) != len(self._counts) or other.resolution_ms != self.resolution_ms:
+            raise ValueError("Cannot merge histograms with different configurations")
+        
+        for index, value in enumerate(other._counts):
+            if value:
+                self._counts[index] += value
+        self.count += other.count
+        self.total_ms += other.total_ms
+        self.min_ms = min(self.min_ms, other.min_ms)
+        self.max_ms = max(self.max_ms, other.max_ms)
+        return self
+    
+    def snapshot(self) -> 'LatencyHistogram':
+        """Independent copy of the current state, e.g. to merge across workers"""
+        copy = LatencyHistogram(self.significant_figures, self.resolution_ms, self.max_latency_ms)
+        return copy.merge(self)
+    
+    @property
+    def mean_ms(self) -> float:
+        """Exact mean of the recorded samples"""
+        return self.total_ms / self.count if self.count else 0.0
+    
+    def percentile(self, percent: float) -> float:
+        """
+        Latency at the given percentile (0-100)
+        Picks the sample at index int(count * percent / 100) of the sorted
+        samples, matching sorted(samples)[int(len(samples) * q)]
+        """
+        return self.percentiles([percent])[percent]
+    
+    def percentiles(self, percents: Sequence[float]) -> Dict[float, float]:
+        """Several percentiles from a single pass over the buckets"""
+        if not self.count:
+            return {percent: 0.0 for percent in percents}
+        
+        ranks = sorted((min(int(self.count * p / 100), self.count - 1) + 1, p) for p in percents)
+        results = {}
+        position = 0
+        seen = 0
+        for index, value in enumerate(self._counts):
+            seen += value
+            while position < len(ranks) and seen >= ranks[position][0]:
+                # Bucket midpoints can fall outside the exact extremes
+                results[ranks[position][1]] = min(max(self._value(index), self.min_ms), self.max_ms)
+                position += 1
+            if position == len(ranks):
+                break
+        return results
+    
+    def metrics(self) -> Dict[str, float]:
+        """Latency summary in the shape used by the test clients"""
+        if not self.count:
+            return {}
+        
+        values = self.percentiles([50, 95, 99, 99.9])
+        return {
+            'average_latency_ms': self.mean_ms,
+            'min_latency_ms': self.min_ms,
+            'max_latency_ms': self.max_ms,
+            'p50_latency_ms': values[50],
+            'p95_latency_ms': values[95],
+            'p99_latency_ms': values[99],
+            'p999_latency_ms': values[99.9]
+        }
@@ -0,0 +1,99 @@
+"""
+Latency measurement runs
+Monotonic nanosecond timing, warmup, and open-loop fixed-rate issuance with
+coordinated-omission correction, so reported percentiles reflect what a
+caller waiting at a steady arrival rate would actually experience
+"""
+from typing import Any, Callable, Dict
+from loguru import logger
+from framework.utils.clock import SystemClock
+from framework.utils.latency_histogram import LatencyHistogram
+
+
+class LatencyMeasurement:
+    """
+    Times repeated calls of an operation
+    Warmup calls run first and are discarded. Closed loop (no rate_per_s)
+    issues each call as soon as the previous one returns, which hides
+    stalls: requests that would have queued behind a slow one are simply
+    never sent. Open loop schedules calls at a fixed rate; when a call
+    overruns, the next ones start late and their latency is counted from
+    when they were due, not from when they were finally sent. In closed
+    loop, expected_interval_ms applies the same correction after the fact.
+    """
+    
+    def __init__(self, clock=None, warmup: int = 3, rate_per_s: float = None,
+                 expected_interval_ms: float = None):
+        if rate_per_s is not None and rate_per_s <= 0:
+            raise ValueError("rate_per_s must be positive")
+        self.clock = clock or SystemClock()
+        self.warmup = warmup
+        self.rate_per_s = rate_per_s
+        self.expected_interval_ms = expected_interval_ms
+    
+    def run(self, operation: Callable[[], Any], iterations: int) -> Dict[str, Any]:
+        """
+        Warm up, then time iterations calls of operation
+        Top-level latency metrics are response times (user-experienced);
+        service_* metrics are the time each call itself took. Calls that
+        raise are counted as errors and not timed; RuntimeError if none succeed.
+        latencies_ms lists each timed call's response time in call order.
+        """
+        for _ in range(self.warmup):
+            operation()
+        
+        response_time = LatencyHistogram()
+        service_time = LatencyHistogram()
+        latencies_ms = []
+        interval_ns = round(1e9 / self.rate_per_s) if self.rate_per_s else 0
+        errors = 0
+        max_lag_ns = 0
+        
+        started_ns = self.clock.monotonic_ns()
+        for i in range(iterations):
+            due_ns = started_ns + i * interval_ns
+            if interval_ns:
+                wait_ns = due_ns - self.clock.monotonic_ns()
+                if wait_ns > 0:
+                    self.clock.sleep(wait_ns / 1e9)
+            
+            sent_ns = self.clock.monotonic_ns()
+            try:
+                operation()
+            except Exception as e:
+                errors += 1
+                logger.warning(f"Latency measurement call {i} failed: {e}")
+                continue
+            done_ns = self.clock.monotonic_ns()
+            
+            service_ms = (done_ns - sent_ns) / 1e6
+            service_time.record(service_ms)
+            if interval_ns:
+                max_lag_ns = max(max_lag_ns, sent_ns - due_ns)
+                latencies_ms.append((done_ns - due_ns) / 1e6)
+                response_time.record(latencies_ms[-1])
+            elif self.expected_interval_ms:
+                latencies_ms.append(service_ms)
+                response_time.record_corrected(service_ms, self.expected_interval_ms)
+            else:
+                latencies_ms.append(service_ms)
+                response_time.record(service_ms)
+        
+        elapsed_s = (self.clock.monotonic_ns() - started_ns) / 1e9
+        completed = iterations - errors
+        if not completed:
+            raise RuntimeError(f"No latency measurement call succeeded ({errors} of {iterations} failed)")
+        return {
+            'mode': 'open-loop' if interval_ns else 'closed-loop',
+            'iterations': iterations,
+            'warmup': self.warmup,
+            'errors': errors,
+            'rate_per_s': self.rate_per_s,
+            'achieved_rate_per_s': completed / elapsed_s if elapsed_s else 0.0,
+            'max_start_lag_ms': max_lag_ns / 1e6,
+            'latencies_ms': latencies_ms,
+            'histogram': response_time,
+            'service_histogram': service_time,
+            **response_time.metrics(),
+            **{f"service_{name}": value for name, value in service_time.metrics().items()}
+        }
@@ -0,0 +1,171 @@
+"""
+Network emulation for the integration clients
+Seeded packet loss, jitter, reordering, bandwidth caps and outages between
+the test clients and the services they call
+"""
+import random
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from loguru import logger
+from framework.utils.clock import SystemClock
+from framework.utils.latency_histogram import LatencyHistogram
+
+
+class NetworkEmulator:
+    """
+    Emulates a degraded network link on a client's clock
+    Unreliable traffic (RTP audio frames) is simply lost, while reliable
+    traffic (ASR requests, caption delivery) is retransmitted with exponential
+    backoff, so loss and outages show up as tail latency. A given seed and
+    send sequence always produces the same delays.
+    """
+    
+    # Named link profiles: one-way latency, jitter and loss typical of each network
+    PROFILES = {
+        'ideal': {},
+        'broadband': {'latency_ms': 15, 'jitter_ms': 2, 'loss_rate': 0.001},
+        'lte': {'latency_ms': 50, 'jitter_ms': 15, 'loss_rate': 0.01, 'reorder_rate': 0.005},
+        '3g': {'latency_ms': 150, 'jitter_ms': 50, 'loss_rate': 0.03, 'reorder_rate': 0.01,
+               'bandwidth_kbps': 384},
+        'congested': {'latency_ms': 250, 'jitter_ms': 120, 'loss_rate': 0.08, 'reorder_rate': 0.05,
+                      'bandwidth_kbps': 128}
+    }
+    
+    def __init__(self, clock=None, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 loss_rate: float = 0.0, reorder_rate: float = 0.0, reorder_delay_ms: float = 40.0,
+                 bandwidth_kbps: float = None, outages: Sequence[Tuple[float, float]] = (),
+                 retransmit_timeout_ms: float = 200.0, max_attempts: int = 6, seed: int = None):
+        """
+        outages: (start, end) windows in seconds from creation during which
+        every packet is lost
+        """
+        self.clock = clock or SystemClock()
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.loss_rate = loss_rate
+        self.reorder_rate = reorder_rate
+        self.reorder_delay_ms = reorder_delay_ms
+        self.bandwidth_kbps = bandwidth_kbps
+        self.retransmit_timeout_ms = retransmit_timeout_ms
+        self.max_attempts = max_attempts
+        self.seed = seed
+        
+        self.started_at = self.clock.time()
+        self.outages = [(self.started_at + start, self.started_at + end) for start, end in outages]
+        self._rng = random.Random(seed)
+        self._link_free_at = self.started_at
+        self.latency = LatencyHistogram()
+        self.stats = {'packets_sent': 0, 'packets_lost': 0, 'packets_reordered': 0,
+                      'retransmissions': 0, 'bytes_sent': 0}
+    
+    @classmethod
+    def from_profile(cls, name: str, clock=None, seed: int = None, **overrides) -> 'NetworkEmulator':
+        """Create an emulator from a named profile, e.g. 'lte' or 'congested'"""
+        if name not in cls.PROFILES:
+            raise ValueError(f"Unknown network profile: {name}")
+        return cls(clock=clock, seed=seed, **{**cls.PROFILES[name], **overrides})
+    
+    def fork(self, clock=None, worker: int = 0) -> 'NetworkEmulator':
+        """
+        Emulator with the same link settings and its own RNG and state
+        For parallel workers: each gets its own link on its own clock, so one
+        worker's traffic never shifts another's random draws. The fork is
+        seeded with this emulator's seed plus worker (unseeded when this one
+        is), so each worker's draws are reproducible. Outages keep their
+        offsets from this emulator's creation.
+        """
+        return NetworkEmulator(
+            clock or self.clock, self.latency_ms, self.jitter_ms, self.loss_rate, self.reorder_rate,
+            self.reorder_delay_ms, self.bandwidth_kbps,
+            [(start - self.started_at, end - self.started_at) for start, end in self.outages],
+            self.retransmit_timeout_ms, self.max_attempts, None if self.seed is None else self.seed + worker
+        )
+    
+    def in_outage(self, at: float) -> bool:
+        """Whether the link is down at the given clock time"""
+        return any(start <= at < end for start, end in self.outages)
+    
+    def transmit(self, size_bytes: int, at: float = None) -> Optional[float]:
+        """
+        Send one packet at clock time at (default now)
+        Returns its one-way delay in seconds, or None if it was lost
+        """
+        at = self.clock.time() if at is None else at
+        self.stats['packets_sent'] += 1
+        self.stats['bytes_sent'] += size_bytes
+        
+        # Serialization queues behind earlier packets on a capped link
+        start = max(at, self._link_free_at)
+        if self.bandwidth_kbps:
+            self._link_free_at = start + size_bytes * 8 / (self.bandwidth_kbps * 1000)
+        else:
+            self._link_free_at = start
+        
+        # Draw every random value up front so loss does not shift later draws
+        lost = self._rng.random() < self.loss_rate
+        jitter = self._rng.uniform(-self.jitter_ms, self.jitter_ms)
+        held = self._rng.random() < self.reorder_rate
+        
+        if lost or self.in_outage(start):
+            self.stats['packets_lost'] += 1
+            return None
+        
+        delay_ms = max(self.latency_ms + jitter, 0.0)
+        if held:
+            delay_ms += self.reorder_delay_ms
+        delay = self._link_free_at - at + delay_ms / 1000
+        self.latency.record(delay * 1000)
+        return delay
+    
+    def send_reliable(self, size_bytes: int) -> Tuple[float, int]:
+        """
+        Send a message over a retransmitting transport
+        Returns (delay in seconds, attempts). Raises ConnectionError when
+        every attempt is lost, e.g. during a long outage.
+        """
+        now = self.clock.time()
+        waited = 0.0
+        timeout = self.retransmit_timeout_ms / 1000
+        
+        for attempt in range(1, self.max_attempts + 1):
+            delay = self.transmit(size_bytes, now + waited)
+            if delay is not None:
+                return waited + delay, attempt
+            self.stats['retransmissions'] += 1
+            waited += timeout
+            timeout *= 2
+        
+        logger.warning(f"Network emulator gave up after {self.max_attempts} attempts")
+        raise ConnectionError(f"Message lost after {self.max_attempts} attempts "
+                              f"({waited * 1000:.0f}ms)")
+    
+    def send_stream(self, frames: Sequence[bytes], frame_interval: float) -> List[Dict[str, Any]]:
+        """
+        Send frames paced at frame_interval seconds over an unreliable transport
+        Returns the frames that arrived, in arrival order, with their
+        sequence number, send and arrival times
+        """
+        now = self.clock.time()
+        arrivals = []
+        for sequence, frame in enumerate(frames):
+            sent_at = now + sequence * frame_interval
+            delay = self.transmit(len(frame), sent_at)
+            if delay is not None:
+                arrivals.append({'sequence': sequence, 'sent_at': sent_at,
+                                 'arrived_at': sent_at + delay, 'data': frame})
+        
+        arrivals.sort(key=lambda a: (a['arrived_at'], a['sequence']))
+        highest = -1
+        for arrival in arrivals:
+            if arrival['sequence'] < highest:
+                self.stats['packets_reordered'] += 1
+            highest = max(highest, arrival['sequence'])
+        return arrivals
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Link counters plus one-way delay percentiles of delivered packets"""
+        sent = self.stats['packets_sent']
+        return {
+            **self.stats,
+            'loss_rate': self.stats['packets_lost'] / sent if sent else 0.0,
+            **self.latency.metrics()
+        }
@@ -2,21 +2,27 @@
 Telephony integration client for testing call functionality
 Simulates and tests telephony system integration
 """
-import time
+import itertools
 import requests
 from typing import Dict, Any, Optional, Callable
 from loguru import logger
 from framework.utils.config_loader import ConfigLoader
+from framework.utils.clock import SystemClock
+from framework.utils.audio_buffer import frame_size, frame_views
+from framework.utils.audio_codec import TELEPHONY_SAMPLE_RATE, encode, resample
 
 
 class TelephonyClient:
     """Client for telephony system integration testing"""
     
-    def __init__(self, base_url: str = None):
+    def __init__(self, base_url: str = None, clock=None, network=None):
         self.config = ConfigLoader().load_config()
         self.base_url = base_url or self.config.get('telephony', {}).get('api_url', '')
         self.session = requests.Session()
+        self.clock = clock or SystemClock()
+        self.network = network
         self.active_calls = {}
+        self._call_sequence = itertools.count(1)
     
     def initiate_call(self, from_number: str, to_number: str, 
                      call_type: str = "standard") -> Dict[str, Any]:
@@ -28,13 +34,14 @@ class TelephonyClient:
             'from_number': from_number,
             'to_number': to_number,
             'call_type': call_type,
-            'timestamp': time.time(),
+            'timestamp': self.clock.time(),
             'status': 'initiating'
         }
         
         # In real implementation, this would call telephony API
         # For testing, we simulate the call initiation
-        call_id = f"call_{int(time.time())}"
+        # The sequence keeps IDs unique for calls placed within the same second
+        call_id = f"call_{int(self.clock.time())}_{next(self._call_sequence)}"
         call_data['call_id'] = call_id
         call_data['status'] = 'ringing'
         
@@ -50,7 +57,7 @@ class TelephonyClient:
         
         call_data = self.active_calls[call_id]
         call_data['status'] = 'active'
-        call_data['answered_at'] = time.time()
+        call_data['answered_at'] = self.clock.time()
         
         logger.info(f"Call answered: {call_id}")
         return call_data
@@ -62,7 +69,7 @@ class TelephonyClient:
         
         call_data = self.active_calls[call_id]
         call_data['status'] = 'ended'
-        call_data['ended_at'] = time.time()
+        call_data['ended_at'] = self.clock.time()
         
         if 'answered_at' in call_data:
             call_data['duration'] = call_data['ended_at'] - call_data['answered_at']
@@ -71,8 +78,14 @@ class TelephonyClient:
         return call_data
     
     def send_audio_stream(self, call_id: str, audio_data: bytes, 
-                         sample_rate: int = 8000) -> bool:
-        """Send audio stream for captioning"""
+                         sample_rate: int = 8000, codec: str = None, sample_width: int = 2) -> bool:
+        """
+        Send audio stream for captioning
+        With codec ('ulaw' or 'alaw'), audio_data is 16-bit PCM at sample_rate
+        and is resampled to 8 kHz and companded as a phone line would.
+        Otherwise it is sent as is, with sample_width bytes per sample:
+        2 for 16-bit PCM, 1 for audio that is already G.711.
+        """
         if call_id not in self.active_calls:
             return False
         
@@ -81,10 +94,54 @@ class TelephonyClient:
             logger.warning(f"Call {call_id} is not active, cannot send audio")
             return False
         
+        if codec:
+            if sample_rate != TELEPHONY_SAMPLE_RATE:
+                audio_data = resample(audio_data, sample_rate, TELEPHONY_SAMPLE_RATE)
+            audio_data = encode(audio_data, codec)
+            sample_rate = TELEPHONY_SAMPLE_RATE
+            sample_width = 1
+            call_data['codec'] = codec
+        
         # In real implementation, this would stream audio to ASR service
+        if self.network is not None:
+            return self._stream_over_network(call_data, audio_data, sample_rate, sample_width)
+        
         logger.debug(f"Audio stream sent for call {call_id}, {len(audio_data)} bytes")
         return True
     
+    def _stream_over_network(self, call_data: Dict[str, Any], audio_data: bytes,
+                             sample_rate: int, sample_width: int, frame_ms: int = 20) -> bool:
+        """
+        Send audio as paced RTP-style frames through the network emulator
+        Frames hold frame_ms of audio at sample_width bytes per sample. Lost
+        frames are not resent, and the clock advances by the audio duration.
+        Per-call frame counts accumulate in call_data['audio_stream'].
+        """
+        # Frames are memoryviews into audio_data, so long calls are not copied frame by frame
+        frames = list(frame_views(audio_data, max(1, frame_size(sample_rate, frame_ms, sample_width))))
+        arrivals = self.network.send_stream(frames, frame_ms / 1000)
+        
+        reordered = 0
+        highest = -1
+        for arrival in arrivals:
+            reordered += arrival['sequence'] < highest
+            highest = max(highest, arrival['sequence'])
+        stream = call_data.setdefault('audio_stream', {'frames_sent': 0, 'frames_received': 0,
+                                                       'frames_lost': 0, 'frames_reordered': 0})
+        stream['frames_sent'] += len(frames)
+        stream['frames_received'] += len(arrivals)
+        stream['frames_lost'] += len(frames) - len(arrivals)
+        stream['frames_reordered'] += reordered
+        
+        self.clock.sleep(len(frames) * frame_ms / 1000)
+        
+        logger.debug(f"Audio stream sent for call {call_data['call_id']}: "
+                     f"{len(arrivals)}/{len(frames)} frames arrived, {reordered} out of order")
+        if frames and not arrivals:
+            logger.warning(f"All audio frames lost for call {call_data['call_id']}")
+            return False
+        return True
+    
     def get_call_status(self, call_id: str) -> Dict[str, Any]:
         """Get current call status"""
         if call_id not in self.active_calls:
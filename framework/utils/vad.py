@@ -0,0 +1,126 @@
+"""
+Voice activity detection for call audio
+Frame energy and zero-crossing rate, computed with NumPy over whole chunks,
+decide which chunks carry speech so silent ones can skip ASR
+"""
+from typing import Any, Dict, Iterable, Iterator, Union
+import numpy as np
+from framework.utils.audio_codec import as_pcm16, decode
+
+
+class VoiceActivityDetector:
+    """
+    Streaming energy/ZCR voice activity detector
+    A frame is speech when its level is above energy_threshold_db (dBFS),
+    or within weak_margin_db of it with a zero-crossing rate above
+    zcr_threshold, which catches quiet unvoiced consonants. Speech is held
+    for hangover_ms after the last speech frame so word endings and short
+    pauses are not clipped. Chunks are G.711 bytes when codec is set,
+    otherwise 16-bit PCM; partial frames carry over to the next chunk.
+    """
+    
+    def __init__(self, sample_rate: int = 8000, frame_ms: int = 20, energy_threshold_db: float = -45.0,
+                 zcr_threshold: float = 0.3, weak_margin_db: float = 10.0, hangover_ms: int = 200,
+                 codec: str = None):
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.frame_samples = sample_rate * frame_ms // 1000
+        self.energy_threshold_db = energy_threshold_db
+        self.zcr_threshold = zcr_threshold
+        self.weak_margin_db = weak_margin_db
+        self.hangover_frames = hangover_ms // frame_ms
+        self.codec = codec
+        self.stats = {'chunks': 0, 'speech_chunks': 0, 'frames': 0, 'speech_frames': 0,
+                      'audio_ms': 0.0, 'skipped_ms': 0.0}
+        self.reset()
+    
+    def reset(self):
+        """Forget carried samples and hangover state, e.g. for a new call; statistics accumulate"""
+        self._carry = np.zeros(0, dtype=np.int16)
+        self._since_speech = self.hangover_frames + 1
+    
+    def _samples(self, chunk: Union[bytes, bytearray, memoryview, np.ndarray]) -> np.ndarray:
+        """Chunk as int16 samples"""
+        if self.codec and not isinstance(chunk, np.ndarray):
+            return decode(chunk, self.codec)
+        return as_pcm16(chunk)
+    
+    def frame_features(self, samples: np.ndarray):
+        """Per-frame level in dBFS and zero-crossing rate for whole frames of samples"""
+        count = len(samples) // self.frame_samples
+        frames = samples[:count * self.frame_samples].reshape(count, self.frame_samples).astype(np.float32)
+        power = np.mean(frames * frames, axis=1) / (32768.0 * 32768.0)
+        energy_db = 10 * np.log10(power + 1e-12)
+        signs = np.signbit(frames)
+        zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+        return energy_db, zcr
+    
+    def classify(self, chunk) -> np.ndarray:
+        """
+        Speech flag for each frame completed by this chunk, after hangover
+        Continues from the previous chunk's carried samples and hangover
+        """
+        samples = self._samples(chunk)
+        if self._carry.size:
+            samples = np.concatenate((self._carry, samples))
+        usable = len(samples) - len(samples) % self.frame_samples
+        self._carry = samples[usable:].copy()
+        
+        energy_db, zcr = self.frame_features(samples[:usable])
+        raw = (energy_db > self.energy_threshold_db) | (
+            (energy_db > self.energy_threshold_db - self.weak_margin_db) & (zcr > self.zcr_threshold))
+        
+        # Frames since the most recent raw speech frame, carried across chunks
+        index = np.arange(len(raw))
+        last_speech = np.maximum.accumulate(np.where(raw, index, -self._since_speech))
+        since = index - last_speech
+        if len(raw):
+            self._since_speech = int(since[-1]) + 1
+        return since <= self.hangover_frames
+    
+    def is_speech(self, chunk) -> bool:
+        """Whether a chunk should go to ASR; updates the statistics"""
+        samples = self._samples(chunk)
+        speech = self.classify(samples)
+        # A chunk too short to finish a frame follows the current hangover state
+        active = bool(speech.any()) if len(speech) else self._since_speech <= self.hangover_frames
+        
+        chunk_ms = len(samples) * 1000 / self.sample_rate
+        self.stats['chunks'] += 1
+        self.stats['speech_chunks'] += active
+        self.stats['frames'] += len(speech)
+        self.stats['speech_frames'] += int(speech.sum())
+        self.stats['audio_ms'] += chunk_ms
+        if not active:
+            self.stats['skipped_ms'] += chunk_ms
+        return active
+    
+    def gate(self, chunks: Iterable, max_segment_ms: int = None) -> Iterator[bytes]:
+        """
+        Drop silent chunks and coalesce runs of speech chunks into segments
+        A segment is yielded when silence follows it, when it reaches
+        max_segment_ms, or at the end of the stream
+        """
+        segment = bytearray()
+        bytes_per_ms = self.sample_rate * (1 if self.codec else 2) / 1000
+        for chunk in chunks:
+            if self.is_speech(chunk):
+                segment += chunk
+                if max_segment_ms and len(segment) >= max_segment_ms * bytes_per_ms:
+                    yield bytes(segment)
+                    segment.clear()
+            elif segment:
+                yield bytes(segment)
+                segment.clear()
+        if segment:
+            yield bytes(segment)
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """How much audio was classified as speech and how much ASR work was skipped"""
+        stats = self.stats
+        return {
+            **stats,
+            'skipped_chunks': stats['chunks'] - stats['speech_chunks'],
+            'speech_ratio': stats['speech_frames'] / stats['frames'] if stats['frames'] else 0.0,
+            'asr_work_saved': stats['skipped_ms'] / stats['audio_ms'] if stats['audio_ms'] else 0.0
+        }
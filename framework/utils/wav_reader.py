@@ -0,0 +1,159 @@
+"""
+Memory-mapped WAV and raw PCM ingestion
+Recorded calls are mapped rather than read, and frames are memoryviews into
+the map, so a regression run only pages in the audio it actually streams
+"""
+import mmap
+import struct
+from pathlib import Path
+from typing import Iterator, Optional
+from loguru import logger
+from framework.utils.audio_buffer import frame_size, frame_views
+
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_ALAW = 0x0006
+WAVE_FORMAT_MULAW = 0x0007
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+_FORMAT_CODECS = {WAVE_FORMAT_PCM: None, WAVE_FORMAT_ALAW: 'alaw', WAVE_FORMAT_MULAW: 'ulaw'}
+_CODEC_FORMATS = {codec: tag for tag, codec in _FORMAT_CODECS.items()}
+
+RAW_SUFFIXES = ('.raw', '.pcm', '.ul', '.al')
+
+
+class AudioFile:
+    """
+    Read-only memory map of one recorded call
+    WAV headers are parsed in place; raw files (.raw/.pcm, or .ul/.al for
+    G.711) take their format from the constructor. data is a zero-copy view
+    of the samples, valid until close(). A transcript next to the audio
+    (same name, .txt) is picked up as the reference text.
+    """
+    
+    def __init__(self, path, sample_rate: int = 8000, sample_width: int = 1, channels: int = 1,
+                 codec: Optional[str] = None):
+        self.path = Path(path)
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.channels = channels
+        self.codec = codec
+        self._file = open(self.path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"Audio file is empty: {self.path}")
+        view = memoryview(self._map)
+        
+        suffix = self.path.suffix.lower()
+        if suffix in ('.ul', '.al'):
+            self.codec = codec or ('ulaw' if suffix == '.ul' else 'alaw')
+            self.sample_width = 1
+        if suffix in RAW_SUFFIXES:
+            self.data = view
+            return
+        try:
+            start, end = self._parse_wav()
+        except (ValueError, struct.error):
+            view.release()
+            self._map.close()
+            self._file.close()
+            raise
+        self.data = view[start:end]
+        view.release()
+    
+    def _parse_wav(self):
+        """Read the fmt chunk and locate the data chunk; returns the data span"""
+        riff, _, wave = struct.unpack_from('<4sI4s', self._map, 0)
+        if riff != b'RIFF' or wave != b'WAVE':
+            raise ValueError(f"Not a RIFF/WAVE file: {self.path}")
+        
+        position = 12
+        fmt_found = False
+        while position + 8 <= len(self._map):
+            chunk_id, chunk_size = struct.unpack_from('<4sI', self._map, position)
+            body = position + 8
+            if chunk_id == b'fmt ':
+                tag, self.channels, self.sample_rate, _, _, bits = struct.unpack_from('<HHIIHH', self._map, body)
+                if tag == WAVE_FORMAT_EXTENSIBLE and chunk_size >= 40:
+                    tag = struct.unpack_from('<H', self._map, body + 24)[0]
+                if tag not in _FORMAT_CODECS:
+                    raise ValueError(f"Unsupported WAV format 0x{tag:04X}: {self.path}")
+                self.codec = _FORMAT_CODECS[tag]
+                self.sample_width = bits // 8
+                fmt_found = True
+            elif chunk_id == b'data':
+                if not fmt_found:
+                    raise ValueError(f"WAV data chunk before fmt chunk: {self.path}")
+                # Truncated recordings and streamed headers can overstate the size
+                return body, min(body + chunk_size, len(self._map))
+            position = body + chunk_size + (chunk_size & 1)
+        raise ValueError(f"WAV file has no data chunk: {self.path}")
+    
+    @property
+    def bytes_per_second(self) -> int:
+        """Audio bytes per second of the call"""
+        return self.sample_rate * self.sample_width * self.channels
+    
+    @property
+    def duration_s(self) -> float:
+        """Length of the recording"""
+        return len(self.data) / self.bytes_per_second
+    
+    def frames(self, frame_ms: int = 20) -> Iterator[memoryview]:
+        """Telephony frames as views into the map"""
+        return frame_views(self.data, frame_size(self.sample_rate, frame_ms, self.sample_width, self.channels))
+    
+    def chunks(self, chunk_ms: int = 200) -> Iterator[memoryview]:
+        """ASR-sized chunks as views into the map"""
+        return self.frames(chunk_ms)
+    
+    def reference_text(self) -> Optional[str]:
+        """Transcript stored beside the recording, if any"""
+        transcript = self.path.with_suffix('.txt')
+        return transcript.read_text(encoding='utf-8').strip() if transcript.exists() else None
+    
+    def close(self):
+        """Unmap the file; views still held elsewhere keep the map alive until released"""
+        self.data.release()
+        try:
+            self._map.close()
+        except BufferError:
+            logger.debug(f"Frames of {self.path.name} still in use; unmapping when they are released")
+        self._file.close()
+    
+    def __enter__(self) -> 'AudioFile':
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def iter_recordings(directory, pattern: str = '*.wav', **raw_format) -> Iterator[AudioFile]:
+    """
+    Open the recordings in a directory one at a time, in name order
+    Each file is mapped when the consumer reaches it and closed when the
+    consumer moves on; raw_format describes raw files
+    """
+    for path in sorted(Path(directory).glob(pattern)):
+        with AudioFile(path, **raw_format) as recording:
+            yield recording
+
+
+def write_wav(path, audio_data, sample_rate: int = 8000, sample_width: int = 2, channels: int = 1,
+              codec: Optional[str] = None):
+    """Write PCM or G.711 (codec 'ulaw' or 'alaw') audio as a WAV file"""
+    if codec:
+        sample_width = 1
+    tag = _CODEC_FORMATS[codec]
+    data = memoryview(audio_data).cast('B')
+    block_align = sample_width * channels
+    header = struct.pack('<4sI4s4sIHHIIHH4sI', b'RIFF', 36 + len(data) + (len(data) & 1), b'WAVE',
+                         b'fmt ', 16, tag, channels, sample_rate, sample_rate * block_align,
+                         block_align, sample_width * 8, b'data', len(data))
+    with open(path, 'wb') as f:
+        f.write(header)
+        f.write(data)
+        if len(data) & 1:
+            f.write(b'\x00')
@@ -0,0 +1,154 @@
+"""
+Minimal WebSocket (RFC 6455) framing for the local ASR stand-in
+Only what our own client and server exchange: unfragmented text and binary
+messages, ping/pong and close
+"""
+import base64
+import hashlib
+import os
+import socket
+import ssl
+import struct
+from typing import BinaryIO, Tuple
+from urllib.parse import urlparse
+
+
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+def accept_key(key: str) -> str:
+    """Sec-WebSocket-Accept value for a client's Sec-WebSocket-Key"""
+    digest = hashlib.sha1((key + _GUID).encode('ascii')).digest()
+    return base64.b64encode(digest).decode('ascii')
+
+
+def encode_frame(opcode: int, payload: bytes, mask: bool) -> bytes:
+    """One final frame; clients must mask, servers must not"""
+    header = bytearray([0x80 | opcode])
+    mask_bit = 0x80 if mask else 0
+    length = len(payload)
+    if length < 126:
+        header.append(mask_bit | length)
+    elif length < 1 << 16:
+        header.append(mask_bit | 126)
+        header += struct.pack('>H', length)
+    else:
+        header.append(mask_bit | 127)
+        header += struct.pack('>Q', length)
+    
+    if not mask:
+        return bytes(header) + payload
+    key = os.urandom(4)
+    return bytes(header) + key + _apply_mask(payload, key)
+
+
+def _apply_mask(payload: bytes, key: bytes) -> bytes:
+    """XOR payload with the repeating 4-byte key"""
+    if not payload:
+        return payload
+    repeated = (key * (len(payload) // 4 + 1))[:len(payload)]
+    return (int.from_bytes(payload, 'big') ^ int.from_bytes(repeated, 'big')).to_bytes(len(payload), 'big')
+
+
+def _read_exact(stream: BinaryIO, size: int) -> bytes:
+    """Read exactly size bytes or raise ConnectionError"""
+    data = stream.read(size)
+    if len(data) < size:
+        raise ConnectionError("WebSocket connection closed")
+    return data
+
+
+def read_frame(stream: BinaryIO) -> Tuple[int, bytes]:
+    """Read one frame from a buffered stream; returns (opcode, payload)"""
+    first, second = _read_exact(stream, 2)
+    if not first & 0x80:
+        raise ValueError("Fragmented WebSocket messages are not supported")
+    
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack('>H', _read_exact(stream, 2))[0]
+    elif length == 127:
+        length = struct.unpack('>Q', _read_exact(stream, 8))[0]
+    
+    key = _read_exact(stream, 4) if second & 0x80 else None
+    payload = _read_exact(stream, length)
+    return first & 0x0F, _apply_mask(payload, key) if key else payload
+
+
+class WebSocketClient:
+    """
+    Blocking WebSocket client connection
+    wss:// URLs connect over TLS (port 443 by default), verified with
+    ssl_context or the system's default trust store
+    """
+    
+    def __init__(self, url: str, timeout: float = 10.0, ssl_context: ssl.SSLContext = None):
+        parsed = urlparse(url)
+        if parsed.scheme not in ('ws', 'wss'):
+            raise ValueError(f"Not a WebSocket URL: {url}")
+        secure = parsed.scheme == 'wss'
+        host = parsed.hostname
+        port = parsed.port or (443 if secure else 80)
+        path = parsed.path or '/'
+        if parsed.query:
+            path += '?' + parsed.query
+        
+        sock = socket.create_connection((host, port), timeout=timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if secure:
+            try:
+                sock = (ssl_context or ssl.create_default_context()).wrap_socket(sock, server_hostname=host)
+            except (ssl.SSLError, OSError):
+                sock.close()
+                raise
+        self.sock = sock
+        self.stream = self.sock.makefile('rb')
+        
+        key = base64.b64encode(os.urandom(16)).decode('ascii')
+        authority = host if parsed.port is None else f"{host}:{port}"
+        request = (f"GET {path} HTTP/1.1\r\nHost: {authority}\r\nUpgrade: websocket\r\n"
+                   f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\n"
+                   f"Sec-WebSocket-Version: 13\r\n\r\n")
+        self.sock.sendall(request.encode('ascii'))
+        
+        status = self.stream.readline().decode('latin-1')
+        headers = {}
+        for line in iter(self.stream.readline, b'\r\n'):
+            if not line:
+                raise ConnectionError("WebSocket handshake interrupted")
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        
+        if ' 101 ' not in status or headers.get('sec-websocket-accept') != accept_key(key):
+            self.close()
+            raise ConnectionError(f"WebSocket handshake failed: {status.strip()}")
+    
+    def send(self, payload: bytes, opcode: int = OP_BINARY):
+        """Send one message"""
+        self.sock.sendall(encode_frame(opcode, payload, mask=True))
+    
+    def receive(self) -> Tuple[int, bytes]:
+        """Receive the next data message, answering pings on the way"""
+        while True:
+            opcode, payload = read_frame(self.stream)
+            if opcode == OP_PING:
+                self.send(payload, OP_PONG)
+            elif opcode == OP_CLOSE:
+                raise ConnectionError("WebSocket closed by server")
+            else:
+                return opcode, payload
+    
+    def close(self):
+        """Send a close frame and release the socket"""
+        try:
+            self.sock.sendall(encode_frame(OP_CLOSE, b'', mask=True))
+        except OSError:
+            pass
+        self.stream.close()
+        self.sock.close()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Corpus scoring script
+Streams (reference, hypothesis, latency_ms, category) records from JSONL or
+CSV files through the caption quality analyzer in constant memory
+"""
+import sys
+import csv
+import json
+import argparse
+from pathlib import Path
+from typing import Dict, Any, Iterator
+from loguru import logger
+from framework.utils.caption_quality import CaptionQualityAnalyzer, CorpusSummary
+
+
+def read_jsonl(path: Path) -> Iterator[Dict[str, Any]]:
+    """Yield records from a JSON Lines file, one per line"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_csv(path: Path) -> Iterator[Dict[str, Any]]:
+    """Yield records from a CSV file with a header row"""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        yield from csv.DictReader(f)
+
+
+def read_records(paths, file_format=None) -> Iterator[Dict[str, Any]]:
+    """Yield normalized records from every input file in turn"""
+    for path in paths:
+        path = Path(path)
+        fmt = file_format or ('csv' if path.suffix.lower() == '.csv' else 'jsonl')
+        reader = read_csv if fmt == 'csv' else read_jsonl
+        for record in reader(path):
+            yield {
+                'reference': record.get('reference') or '',
+                'hypothesis': record.get('hypothesis') or '',
+                'latency_ms': float(record.get('latency_ms') or 0.0),
+                'category': record.get('category') or 'general'
+            }
+
+
+def score_corpus(records: Iterator[Dict[str, Any]], analyzer: CaptionQualityAnalyzer,
+                 output_path: Path, chunk_size: int = 1000) -> Dict[str, Any]:
+    """
+    Score records and write one JSON result per line as they complete
+    Returns the overall summary plus a summary per category
+    """
+    overall = CorpusSummary()
+    by_category = {}
+    cases = ((record['reference'], record['hypothesis'], record['latency_ms'], record['category'])
+             for record in records)
+    
+    with open(output_path, 'w', encoding='utf-8') as out:
+        for index, result in enumerate(analyzer.iter_analyze(cases, chunk_size=chunk_size)):
+            overall.add(result)
+            by_category.setdefault(result['category'], CorpusSummary()).add(result)
+            out.write(json.dumps({'index': index, **result}) + '\n')
+    
+    summary = overall.to_dict()
+    summary['by_category'] = {name: s.to_dict() for name, s in sorted(by_category.items())}
+    return summary
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Score ASR caption corpora")
+    
+    parser.add_argument(
+        "inputs",
+        nargs="+",
+        help="JSONL or CSV files with reference, hypothesis, latency_ms and category"
+    )
+    
+    parser.add_argument(
+        "-f", "--format",
+        choices=["jsonl", "csv"],
+        help="Input format (default: from file extension)"
+    )
+    
+    parser.add_argument(
+        "-o", "--output",
+        default="reports/corpus_results.jsonl",
+        help="Per-item results file (JSON Lines)"
+    )
+    
+    parser.add_argument(
+        "-s", "--summary",
+        default="reports/corpus_summary.json",
+        help="Summary file"
+    )
+    
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=1000,
+        help="Records scored per vectorized chunk"
+    )
+    
+    parser.add_argument("--wer-threshold", type=float, default=0.05)
+    parser.add_argument("--latency-threshold-ms", type=int, default=2000)
+    parser.add_argument("--accuracy-threshold", type=float, default=0.95)
+    
+    parser.add_argument(
+        "--log-level",
+        default="WARNING",
+        help="Log level (per-item INFO logging is costly on large corpora)"
+    )
+    
+    args = parser.parse_args()
+    
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level)
+    
+    output_path = Path(args.output)
+    summary_path = Path(args.summary)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    summary_path.parent.mkdir(parents=True, exist_ok=True)
+    
+    analyzer = CaptionQualityAnalyzer(
+        wer_threshold=args.wer_threshold,
+        latency_threshold_ms=args.latency_threshold_ms,
+        accuracy_threshold=args.accuracy_threshold
+    )
+    
+    summary = score_corpus(read_records(args.inputs, args.format), analyzer,
+                           output_path, args.chunk_size)
+    
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
+    
+    print(f"Scored {summary['total_tests']} captions: "
+          f"pass rate {summary['pass_rate']:.2%}, avg WER {summary['avg_wer']:.4f}")
+    print(f"Results: {output_path}")
+    print(f"Summary: {summary_path}")
+    
+    sys.exit(0 if summary['total_tests'] else 1)
+
+
+if __name__ == "__main__":
+    main()
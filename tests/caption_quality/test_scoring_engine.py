@@ -0,0 +1,296 @@
+"""
+Caption scoring engine tests
+Tests alignment and metric computation without a browser session
+"""
+import random
+import time
+import tracemalloc
+import numpy as np
+import pytest
+from jiwer import wer, cer, process_words
+from framework.utils.caption_quality import CaptionQualityAnalyzer, CorpusSummary, IncrementalWERScorer
+from framework.utils.caption_quality import CaptionQualityResults, TextNormalizer
+from framework.utils.edit_distance import batch_error_counts, error_rates
+from framework.utils.bootstrap import bootstrap_mean_ci, bootstrap_ratio_ci
+from loguru import logger
+
+
+@pytest.mark.caption_quality
+class TestScoringEngine:
+    """Test cases for the caption scoring engine"""
+    
+    def setup_method(self):
+        """Setup for each test"""
+        self.quality_analyzer = CaptionQualityAnalyzer()
+        self.pairs = [
+            ("Hello, this is a test of the captioning system.",
+             "Hello, this is a test of the caption system."),
+            ("The quick brown fox jumps over the lazy dog.",
+             "The quick brown fox jumped over a lazy dog today."),
+            ("I would like to schedule an appointment",
+             "like to schedule appointment"),
+            ("ClearCaptions service", "ClearCaptions service"),
+        ]
+    
+    def test_alignment_matches_jiwer(self):
+        """Test single-pass alignment against jiwer metrics"""
+        for reference, hypothesis in self.pairs:
+            alignment = self.quality_analyzer.align(reference, hypothesis)
+            expected = process_words(reference, hypothesis)
+            
+            assert alignment.substitutions == expected.substitutions
+            assert alignment.deletions == expected.deletions
+            assert alignment.insertions == expected.insertions
+            assert alignment.wer == pytest.approx(wer(reference, hypothesis))
+            assert alignment.cer == pytest.approx(cer(reference, hypothesis))
+            assert alignment.accuracy == pytest.approx(1 - alignment.wer)
+        
+        logger.info(f"Alignment verified for {len(self.pairs)} pairs")
+    
+    def test_analysis_uses_alignment_metrics(self):
+        """Test comprehensive analysis reports the same metrics as the single calls"""
+        reference, hypothesis = self.pairs[1]
+        
+        results = self.quality_analyzer.analyze_caption_quality(reference, hypothesis, 1000)
+        
+        assert results['wer'] == pytest.approx(self.quality_analyzer.calculate_wer(reference, hypothesis))
+        assert results['cer'] == pytest.approx(self.quality_analyzer.calculate_cer(reference, hypothesis))
+        assert results['accuracy'] == pytest.approx(self.quality_analyzer.calculate_accuracy(reference, hypothesis))
+        assert results['passed'] is False
+    
+    def test_analysis_empty_reference(self):
+        """Test empty reference falls back to worst-case metrics"""
+        results = self.quality_analyzer.analyze_caption_quality("", "some words", 500)
+        
+        assert results['wer'] == 1.0
+        assert results['cer'] == 1.0
+        assert results['accuracy'] == 0.0
+        assert results['passed'] is False
+    
+    def test_batch_engine_matches_jiwer(self):
+        """Test vectorized batch WER/CER against jiwer on random pairs"""
+        rng = random.Random(7)
+        vocab = ["call", "caption", "hello", "the", "a", "phone", "Clear", "time", "now"]
+        references, hypotheses = [], []
+        for _ in range(300):
+            references.append(" ".join(rng.choices(vocab, k=rng.randint(1, 25))))
+            hypotheses.append(" ".join(rng.choices(vocab, k=rng.randint(0, 25))))
+        
+        counts = batch_error_counts(references, hypotheses, bucket_size=64)
+        wers = error_rates(counts['word_errors'], counts['ref_words'])
+        cers = error_rates(counts['char_errors'], counts['ref_chars'])
+        
+        for i, (reference, hypothesis) in enumerate(zip(references, hypotheses)):
+            assert wers[i] == pytest.approx(wer(reference, hypothesis))
+            assert cers[i] == pytest.approx(cer(reference, hypothesis))
+    
+    def test_batch_analyze_matches_serial(self):
+        """Test batch analysis matches per-caption analysis"""
+        test_cases = [(ref, hyp, 1000 + 100 * i) for i, (ref, hyp) in enumerate(self.pairs)]
+        test_cases.append(("", "empty reference", 900))
+        
+        results = self.quality_analyzer.batch_analyze(test_cases)
+        
+        for (reference, hypothesis, latency_ms), result in zip(test_cases, results['individual_results']):
+            expected = self.quality_analyzer.analyze_caption_quality(reference, hypothesis, latency_ms)
+            assert result['wer'] == pytest.approx(expected['wer'])
+            assert result['cer'] == pytest.approx(expected['cer'])
+            assert result['passed'] == expected['passed']
+            assert result['issues'] == expected['issues']
+        
+        assert results['summary']['total_tests'] == len(test_cases)
+    
+    def test_parallel_batch_matches_serial(self):
+        """Test process-pool batch analysis keeps input order and summary"""
+        test_cases = [(ref, hyp, 900 + 150 * (i % 10))
+                      for i, (ref, hyp) in enumerate(self.pairs * 10)]
+        
+        serial = self.quality_analyzer.batch_analyze(test_cases)
+        parallel = self.quality_analyzer.batch_analyze(test_cases, workers=2, chunk_size=7)
+        
+        assert parallel['individual_results'] == serial['individual_results']
+        assert parallel['summary'] == serial['summary']
+        logger.info(f"Parallel batch: {parallel['summary']['total_tests']} cases matched serial")
+    
+    def test_gate_matches_full_analysis(self):
+        """Test bounded-distance gating agrees with full analysis pass/fail"""
+        rng = random.Random(11)
+        words = "the caller said the appointment is next tuesday at three".split()
+        for _ in range(200):
+            reference = " ".join(rng.choices(words, k=rng.randint(1, 40)))
+            hypothesis = list(reference.split())
+            for _ in range(rng.randint(0, 3)):
+                hypothesis[rng.randrange(len(hypothesis))] = rng.choice(words + ["uh"])
+            hypothesis = " ".join(hypothesis)
+            latency_ms = rng.choice([1000, 2500])
+            
+            full = self.quality_analyzer.analyze_caption_quality(reference, hypothesis, latency_ms)
+            gate = self.quality_analyzer.gate_caption_quality(reference, hypothesis, latency_ms)
+            
+            assert gate['passed'] == full['passed']
+            assert len(gate['issues']) == len(full['issues'])
+            assert self.quality_analyzer.exceeds_wer_threshold(reference, hypothesis) == \
+                (full['wer'] > self.quality_analyzer.wer_threshold)
+    
+    def test_gate_long_transcript(self):
+        """Test FCC 99% accuracy gating on a full-call transcript"""
+        analyzer = CaptionQualityAnalyzer(wer_threshold=0.01, accuracy_threshold=0.99)
+        sentence = "This is a test of FCC compliance for caption accuracy requirements."
+        reference = " ".join([sentence] * 500)
+        
+        # Gating only bounds the WER, so a failing transcript exits early
+        failing = reference.replace("caption", "captain", 100)
+        gate = analyzer.gate_caption_quality(reference, failing, 2000)
+        assert not gate['passed'], "Transcript with 100 substitutions should fail the FCC gate"
+        assert analyzer.exceeds_wer_threshold(reference, failing)
+        
+        passing = reference.replace("caption", "captain", 20)
+        gate = analyzer.gate_caption_quality(reference, passing, 2000)
+        assert gate['passed'], "Transcript with 20 substitutions should pass the FCC gate"
+        assert analyzer.analyze_caption_quality(reference, passing, 2000)['passed']
+        assert not analyzer.exceeds_wer_threshold(reference, passing)
+        logger.info(f"FCC gate issues: {gate['issues']}")
+    
+    def test_incremental_wer_matches_jiwer(self):
+        """Test running WER over appended, retracted and revised partials"""
+        reference = "I would like to schedule an appointment for next Tuesday at three"
+        scorer = IncrementalWERScorer(reference)
+        
+        partial = ""
+        for word in "I would like to schedule a".split():
+            partial = f"{partial} {word}".strip()
+            assert scorer.append(word) == pytest.approx(wer(reference, partial))
+        
+        assert scorer.retract() == pytest.approx(wer(reference, "I would like to schedule"))
+        
+        revised = "I would like to schedule an appointment for next Thursday"
+        assert scorer.update(revised) == pytest.approx(wer(reference, revised))
+        assert scorer.update(reference) == 0.0
+        assert scorer.words == reference.split()
+    
+    def test_long_transcript_memory(self):
+        """Test a call-length transcript is analyzed without a quadratic alignment matrix"""
+        rng = random.Random(3)
+        words = "please call me back after the meeting on monday".split()
+        reference = " ".join(rng.choices(words, k=12000))
+        hypothesis = " ".join(w if rng.random() > 0.1 else rng.choice(words + ["um"])
+                              for w in reference.split() if rng.random() > 0.02)
+        
+        tracemalloc.start()
+        try:
+            results = self.quality_analyzer.analyze_caption_quality(reference, hypothesis, 1000)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        
+        # A full 12k x 12k word matrix would need well over 100 MB
+        assert peak < 16 * 1024 * 1024, f"Peak traced memory {peak / 1e6:.1f} MB"
+        assert results['wer'] == pytest.approx(wer(reference, hypothesis))
+        assert results['cer'] == pytest.approx(cer(reference, hypothesis))
+        logger.info(f"12k-word analysis peaked at {peak / 1e6:.1f} MB")
+    
+    def test_streaming_analysis_matches_batch(self):
+        """Test generator-based analysis and running summary match batch analysis"""
+        test_cases = [(ref, hyp, 800 + 200 * i) for i, (ref, hyp) in enumerate(self.pairs * 5)]
+        
+        batch = self.quality_analyzer.batch_analyze(test_cases)
+        summary = CorpusSummary()
+        streamed = []
+        for result in self.quality_analyzer.iter_analyze(iter(test_cases), chunk_size=3):
+            summary.add(result)
+            streamed.append(result)
+        
+        assert streamed == batch['individual_results']
+        for key, value in batch['summary'].items():
+            assert summary.to_dict()[key] == pytest.approx(value)
+    
+    def test_normalized_scoring(self, test_data):
+        """Test normalization of numbers, dates, contractions and punctuation"""
+        analyzer = CaptionQualityAnalyzer(normalizer=TextNormalizer(cache_size=2))
+        references = {case['name']: case['reference'] for case in test_data['caption_cases']}
+        
+        hypotheses = {
+            'numbers_and_dates': "the meeting is scheduled for January 15th 2026 at 2:30 pm",
+            'punctuation_test': "hello how are you i am doing well thank you",
+            'fcc_compliance': "FCC requires that captioning services maintain at least 99% "
+                              "accuracy for all telephone conversations"
+        }
+        
+        for name, hypothesis in hypotheses.items():
+            assert self.quality_analyzer.calculate_wer(references[name], hypothesis) > 0
+            assert analyzer.calculate_wer(references[name], hypothesis) == 0.0
+            results = analyzer.batch_analyze([(references[name], hypothesis, 1000)] * 3)
+            assert results['summary']['avg_wer'] == 0.0
+        
+        assert analyzer.normalizer.hits > 0
+        assert len(analyzer.normalizer._cache) <= 2
+    
+    def test_bootstrap_confidence_intervals(self):
+        """Test bootstrap intervals bracket the point estimates and are reproducible"""
+        rng = random.Random(5)
+        words = "we will call you back tomorrow morning".split()
+        test_cases = []
+        for _ in range(400):
+            reference = " ".join(rng.choices(words, k=rng.randint(3, 12)))
+            hypothesis = " ".join(w for w in reference.split() if rng.random() > 0.1)
+            test_cases.append((reference, hypothesis, rng.uniform(800, 2500)))
+        
+        results = self.quality_analyzer.batch_analyze(test_cases, bootstrap_resamples=2000, seed=3)
+        summary = results['summary']
+        intervals = summary['confidence_intervals']
+        
+        for metric in ('avg_wer', 'avg_accuracy', 'avg_latency_ms'):
+            low, high = intervals[metric]
+            assert low <= summary[metric] <= high, f"{metric} should lie inside its interval"
+        assert intervals['avg_accuracy'][0] == pytest.approx(1 - intervals['avg_wer'][1])
+        
+        again = self.quality_analyzer.batch_analyze(test_cases, bootstrap_resamples=2000, seed=3)
+        assert again['summary']['confidence_intervals'] == intervals
+        
+        # Past max_categories rows fall into strata that keep their spread, so intervals keep their width
+        latencies = np.random.default_rng(8).lognormal(6, 1.5, 3000)
+        merged = bootstrap_mean_ci(latencies, 2000, seed=1)
+        raw = bootstrap_mean_ci(latencies, 2000, seed=1, max_categories=16)
+        assert raw[1] - raw[0] == pytest.approx(merged[1] - merged[0], rel=0.15)
+        counts = batch_error_counts([case[0] for case in test_cases], [case[1] for case in test_cases])
+        corpus_wer = counts['word_errors'].sum() / counts['ref_words'].sum()
+        low, high = bootstrap_ratio_ci(counts['word_errors'], counts['ref_words'], 2000, seed=1, max_categories=4)
+        assert low <= corpus_wer <= high
+        logger.info(f"Bootstrap intervals: {intervals}")
+    
+    def test_bootstrap_scales_with_categories(self):
+        """Test bootstrap cost on a million continuous latencies is bounded by the strata"""
+        latencies = np.random.default_rng(4).lognormal(6, 1.5, 1_000_000)
+        
+        # Drawing a million indices per resample takes about 77 ms, so 1000 resamples took over a minute
+        start = time.perf_counter()
+        low, high = bootstrap_mean_ci(latencies, 1000, seed=2)
+        elapsed = time.perf_counter() - start
+        
+        assert low <= latencies.mean() <= high
+        assert elapsed < 10, f"1000 resamples of 1M latencies took {elapsed:.1f}s"
+        logger.info(f"Bootstrap over 1M latencies: {elapsed:.2f}s for 1000 resamples")
+    
+    def test_columnar_results(self, test_data):
+        """Test columnar result store, lazy dicts and per-category summaries"""
+        cases = test_data['caption_cases']
+        test_cases = [(case['reference'], case['reference'], 1000, case['category']) for case in cases]
+        test_cases += [(case['reference'], "garbled caption", 2500, case['category']) for case in cases]
+        
+        results = self.quality_analyzer.batch_analyze(test_cases, columnar=True)
+        store = results['individual_results']
+        
+        assert isinstance(store, CaptionQualityResults)
+        assert len(store) == len(test_cases)
+        assert store[0]['wer'] == 0.0 and store[0]['passed']
+        assert store[-1]['category'] == cases[-1]['category']
+        assert not store[-1]['passed'] and len(store[-1]['issues']) == 3
+        assert store.to_dicts() == self.quality_analyzer.batch_analyze(test_cases)['individual_results']
+        
+        groups = store.group_by_category()
+        assert set(groups) == {case['category'] for case in cases}
+        for summary in groups.values():
+            assert summary['pass_rate'] == pytest.approx(0.5)
+        
+        parallel = self.quality_analyzer.batch_analyze(test_cases, workers=2, chunk_size=4, columnar=True)
+        assert parallel['individual_results'].group_by_category() == groups
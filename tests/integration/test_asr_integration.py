@@ -2,8 +2,31 @@
 ASR (Automatic Speech Recognition) integration tests
 Tests speech-to-text conversion accuracy and performance
 """
+import asyncio
+import io
+import itertools
+import mmap
+import random
+import ssl
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pytest
-from framework.utils.asr_client import ASRClient
+import requests
+from framework.utils.asr_client import ASRClient, HTTPASRTransport, iter_audio_frames
+from framework.utils.asr_stub_server import ASRStubServer, ServiceTimeModel
+from framework.utils.asr_recorder import ASRRecorder
+from framework.utils.accent_matrix import degrade
+from framework.utils.async_asr_client import AsyncASRClient
+from framework.utils import audio_codec
+from framework.utils.vad import VoiceActivityDetector
+from framework.utils.websocket import WebSocketClient
+from framework.utils.telephony_client import TelephonyClient
+from framework.utils.wav_reader import AudioFile, iter_recordings, write_wav
+from framework.utils.clock import VirtualClock
+from framework.utils.network_emulator import NetworkEmulator
+from framework.utils.latency_measurement import LatencyMeasurement
 from loguru import logger
 
 
@@ -65,12 +88,21 @@ class TestASRIntegration:
         self.asr.start_session(self.test_call_id)
         
         audio_data = b'\x00' * 8000
-        latency_results = self.asr.test_asr_latency(audio_data, iterations=5)
+        latency_results = self.asr.test_asr_latency(audio_data, iterations=5, warmup=2)
         
         assert 'average_latency_ms' in latency_results
         assert 'min_latency_ms' in latency_results
         assert 'max_latency_ms' in latency_results
         assert latency_results['average_latency_ms'] > 0
+        assert latency_results['p95_latency_ms'] <= latency_results['max_latency_ms']
+        assert latency_results['histogram'].count == 5
+        assert latency_results['warmup'] == 2 and latency_results['mode'] == 'closed-loop'
+        assert len(latency_results['latencies_ms']) == 5
+        assert max(latency_results['latencies_ms']) == pytest.approx(latency_results['max_latency_ms'], rel=0.01)
+        
+        failing = ASRClient(network=NetworkEmulator(loss_rate=1.0, max_attempts=1))
+        with pytest.raises(RuntimeError):
+            failing.test_asr_latency(audio_data, iterations=3)
         
         logger.info(f"ASR average latency: {latency_results['average_latency_ms']:.2f}ms")
     
@@ -107,6 +139,9 @@ class TestASRIntegration:
         for result in results:
             assert 'transcription' in result
             assert 'latency_ms' in result
+            assert 'running_wer' in result
+        
+        assert results[-1]['running_wer'] == 0.0, "Echoed chunks should match the full reference"
         
         logger.info(f"Streaming ASR processed {len(results)} chunks")
     
@@ -119,3 +154,497 @@ class TestASRIntegration:
         assert self.asr.session_id is None, "Session should be cleared"
         
         logger.info("ASR session ended successfully")
+    
+    def test_async_concurrent_sessions(self):
+        """Test many independent sessions on one async client"""
+        client = AsyncASRClient(processing_delay=0.01)
+        references = ["Hello this is", "a streaming caption", "test"]
+        chunks = [b'\x00' * 1600] * len(references)
+        
+        async def run_calls():
+            sessions = [client.start_session(f"call_{i}") for i in range(50)]
+            assert client.active_sessions == 50
+            results = await asyncio.gather(*(s.process_streaming_audio(chunks, references)
+                                             for s in sessions))
+            for session in sessions:
+                session.end()
+            return sessions, results
+        
+        sessions, results = asyncio.run(run_calls())
+        
+        assert client.active_sessions == 0
+        assert len({s.session_id for s in sessions}) == 50, "Sessions should be distinct"
+        for session, session_results in zip(sessions, results):
+            assert session.transcript == references
+            assert session_results[-1]['running_wer'] == 0.0
+            assert all(r['session_id'] == session.session_id for r in session_results)
+    
+    def test_async_asr_load(self):
+        """Test one event loop driving thousands of concurrent calls"""
+        num_calls = 2000
+        client = AsyncASRClient(processing_delay=0.05, max_concurrency=500)
+        
+        metrics = asyncio.run(client.load_test(num_calls, [b'\x00' * 640] * 2))
+        
+        assert metrics['failed_calls'] == 0
+        assert metrics['requests'] == 2 * num_calls
+        assert metrics['peak_in_flight'] == 500, "Capacity limit should cap concurrency"
+        # Every call starts before any request finishes, so all but 500 first requests queue for a slot
+        assert metrics['slot_waits'] >= num_calls - 500
+        assert client.in_flight == 0
+        assert metrics['p99_latency_ms'] >= metrics['p50_latency_ms'] >= 50
+        
+        logger.info(f"ASR capacity: {metrics['requests_per_s']:.0f} requests/s, "
+                   f"p99 {metrics['p99_latency_ms']:.1f}ms")
+    
+    def test_async_load_test_reused_client(self):
+        """Test one client runs consecutive load tests, each on its own event loop"""
+        client = AsyncASRClient(processing_delay=0.01, max_concurrency=2)
+        
+        runs = [asyncio.run(client.load_test(10, [b'\x00' * 640] * 2)) for _ in range(2)]
+        
+        for metrics in runs:
+            assert metrics['failed_calls'] == 0
+            assert metrics['requests'] == 20
+            assert metrics['peak_in_flight'] == 2
+            assert metrics['slot_waits'] == runs[0]['slot_waits']
+        assert client.latency.count == 20, "Each report should only cover its own run"
+    
+    def test_asr_service_http_pooled(self):
+        """Test real HTTP round trips to the local ASR service reuse pooled connections"""
+        service_time = ServiceTimeModel('lognormal', median_ms=5, sigma=0.3, seed=1)
+        with ASRStubServer(service_time=service_time) as server:
+            transport = HTTPASRTransport(server.url)
+            asr = ASRClient(transport=transport)
+            asr.start_session(self.test_call_id)
+            
+            results = [asr.process_audio(b'\x00' * 3200, f"Caption number {i}") for i in range(20)]
+            transport.close()
+            
+            assert [r['transcription'] for r in results] == [f"Caption number {i}" for i in range(20)]
+            assert all(r['quality']['wer'] == 0.0 for r in results)
+            assert min(r['latency_ms'] for r in results) > 0
+            assert server.stats['requests'] == 20
+            assert server.stats['audio_bytes'] == 20 * 3200
+            assert server.stats['connections'] == 1, "Keep-alive should reuse one connection"
+    
+    def test_asr_service_websocket_script(self):
+        """Test WebSocket streaming against a scripted transcript"""
+        script = ["hello this is", "a streaming caption", "tesst"]
+        references = ["hello this is", "a streaming caption", "test"]
+        with ASRStubServer(script=script) as server:
+            asr = ASRClient(transport=HTTPASRTransport(server.url))
+            asr.start_session(self.test_call_id)
+            
+            results = asr.process_streaming_audio([b'\x00' * 1600] * 3, references)
+            
+            assert [r['transcription'] for r in results] == script
+            assert results[0]['running_wer'] == pytest.approx(4 / 7)
+            assert results[2]['running_wer'] == pytest.approx(1 / 7)
+            assert results[2]['quality']['wer'] == 1.0
+    
+    def test_asr_service_concurrent_websockets(self):
+        """Test several WebSocket streams are served at the same time"""
+        service_time = ServiceTimeModel('fixed', ms=50)
+        with ASRStubServer(service_time=service_time) as server:
+            transport = HTTPASRTransport(server.url)
+            # Every stream waits here until all four are connected at once
+            all_open = threading.Barrier(4)
+            
+            def stream(i):
+                with transport.open_stream(f"session_{i}") as asr_stream:
+                    all_open.wait(timeout=10)
+                    return [asr_stream.transcribe(b'\x00' * 1600, f"call {i} chunk {k}")['text']
+                            for k in range(3)]
+            
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                transcripts = list(pool.map(stream, range(4)))
+            transport.close()
+        
+        assert transcripts == [[f"call {i} chunk {k}" for k in range(3)] for i in range(4)]
+        # A server that handled one connection at a time would break the barrier instead
+        assert server.stats['peak_sessions'] == 4, "All four streams should be open on the server together"
+        assert server.stats['requests'] == 12
+        
+        # wss:// must negotiate TLS, so a plain-text endpoint fails the handshake
+        with ASRStubServer() as server:
+            with pytest.raises(ssl.SSLError):
+                WebSocketClient(f"wss://{server.host}:{server.port}/stream", timeout=2)
+        with pytest.raises(ValueError):
+            WebSocketClient(f"http://{server.host}:{server.port}/stream")
+    
+    def test_asr_service_errors_and_capacity(self):
+        """Test injected failures and capacity rejections surface as HTTP errors"""
+        with ASRStubServer(error_rate=1.0) as server:
+            asr = ASRClient(transport=HTTPASRTransport(server.url))
+            with pytest.raises(requests.HTTPError):
+                asr.process_audio(b'\x00' * 1600, "Will fail")
+            assert server.stats['errors_injected'] == 1
+        
+        service_time = ServiceTimeModel('fixed', ms=50)
+        with ASRStubServer(service_time=service_time, max_concurrency=2, reject_when_busy=True) as server:
+            transport = HTTPASRTransport(server.url, pool_size=8)
+            
+            def request(i):
+                try:
+                    return transport.transcribe(b'\x00' * 1600, f"session_{i}")['text']
+                except requests.HTTPError as e:
+                    return e.response.status_code
+            
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                outcomes = list(pool.map(request, range(8)))
+            transport.close()
+            
+            assert 503 in outcomes, "Requests beyond capacity should be rejected"
+            assert server.stats['peak_in_flight'] <= 2
+            assert server.stats['rejected'] == outcomes.count(503)
+    
+    def test_streaming_iterator_bounded(self):
+        """Test lazy frame streaming keeps in-flight chunks bounded"""
+        max_in_flight = 4
+        produced = [0]
+        
+        def frames():
+            # Ten minutes of 8kHz 16-bit audio, generated on demand
+            source = io.BytesIO(b'\x00' * (8000 * 2 * 600))
+            for frame in iter_audio_frames(source, frame_bytes=32000):
+                produced[0] += 1
+                yield frame
+        
+        with ASRStubServer() as server:
+            asr = ASRClient(transport=HTTPASRTransport(server.url))
+            asr.start_session(self.test_call_id)
+            
+            received = 0
+            for result in asr.iter_streaming_audio(frames(), max_in_flight=max_in_flight):
+                assert result['sequence'] == received, "Results should arrive in order"
+                received += 1
+                # In-flight window plus one frame of lookahead
+                assert produced[0] - received <= max_in_flight + 1
+            
+            assert received == 300
+            assert result['final'] is True
+            assert server.stats['audio_bytes'] == 8000 * 2 * 600
+    
+    def test_async_streaming_iterator(self):
+        """Test async streaming from an async source with concurrent in-flight chunks"""
+        client = AsyncASRClient(processing_delay=0.01)
+        words = "please call me back after the meeting".split()
+        
+        async def source():
+            for _ in words:
+                await asyncio.sleep(0)
+                yield b'\x00' * 1600
+        
+        async def run():
+            session = client.start_session(self.test_call_id)
+            results = [r async for r in session.stream_audio(source(), words, " ".join(words),
+                                                             max_in_flight=3)]
+            session.end()
+            return results
+        
+        results = asyncio.run(run())
+        
+        assert [r['sequence'] for r in results] == list(range(len(words)))
+        assert [r['final'] for r in results] == [False] * (len(words) - 1) + [True]
+        assert results[-1]['running_wer'] == 0.0
+        assert client.peak_in_flight == 3
+    
+    def test_g711_call_audio_to_asr(self):
+        """Test companded 8 kHz call audio is decoded and upsampled for ASR"""
+        t = np.arange(8000) / 8000
+        tone = (8000 * np.sin(2 * np.pi * 440 * t)).astype(np.int16)
+        
+        for codec in audio_codec.CODECS:
+            decoded = audio_codec.decode(audio_codec.encode(tone, codec), codec)
+            # G.711 keeps roughly 3% relative error at this level
+            assert np.abs(decoded.astype(int) - tone).max() < 300, f"{codec} round trip too lossy"
+        
+        wideband = audio_codec.resample(tone, 8000, 16000)
+        expected = 8000 * np.sin(2 * np.pi * 440 * np.arange(16000) / 16000)
+        assert len(wideband) == 16000
+        assert np.abs(wideband[100:-100] - expected[100:-100]).max() < 5, "Upsampled tone should be clean"
+        assert np.array_equal(audio_codec.resample(wideband, 16000, 8000)[100:-100], tone[100:-100])
+        
+        call_audio = audio_codec.encode(tone, 'ulaw')
+        with ASRStubServer() as server:
+            asr = ASRClient(transport=HTTPASRTransport(server.url), input_codec='ulaw')
+            asr.start_session(self.test_call_id)
+            for start in range(0, len(call_audio), 1600):
+                asr.process_audio(call_audio[start:start + 1600], "call audio")
+            asr.transport.close()
+            
+            # One byte per 8 kHz sample in, two bytes per 16 kHz sample out
+            assert server.stats['audio_bytes'] == 4 * len(call_audio)
+        
+        logger.info("G.711 call audio converted for ASR")
+    
+    def test_vad_skips_silent_chunks(self):
+        """Test silent call audio never reaches ASR and the savings are reported"""
+        rng = np.random.default_rng(7)
+        t = np.arange(8000) / 8000
+        speech = (6000 * np.sin(2 * np.pi * 300 * t)).astype(np.int16)
+        silence = rng.normal(0, 30, 16000).astype(np.int16)  # about -60 dBFS line noise
+        call_audio = audio_codec.encode(np.concatenate((silence, speech, silence, speech)), 'ulaw')
+        chunks = [call_audio[i:i + 1600] for i in range(0, len(call_audio), 1600)]
+        
+        with ASRStubServer() as server:
+            vad = VoiceActivityDetector()
+            asr = ASRClient(transport=HTTPASRTransport(server.url), input_codec='ulaw', vad=vad)
+            assert vad.codec == 'ulaw', "The detector should read chunks in the client's input format"
+            asr.start_session(self.test_call_id)
+            results = list(asr.iter_streaming_audio(chunks, max_in_flight=3))
+            asr.transport.close()
+            sent_requests = server.stats['requests']
+        
+        skipped = [r['sequence'] for r in results if r.get('vad_skipped')]
+        assert [r['sequence'] for r in results] == list(range(len(chunks))), "Results should stay in order"
+        # Speech is chunks 10-14 and 25-29; 200ms hangover keeps one chunk after each
+        assert skipped == list(range(10)) + list(range(16, 25))
+        assert sent_requests == len(chunks) - len(skipped), "Skipped chunks should never be sent"
+        
+        metrics = vad.get_metrics()
+        assert metrics['skipped_chunks'] == len(skipped)
+        assert metrics['asr_work_saved'] == pytest.approx(len(skipped) / len(chunks))
+        
+        with pytest.raises(ValueError):
+            ASRClient(input_codec='ulaw', vad=VoiceActivityDetector(codec='alaw'))
+        
+        segments = list(VoiceActivityDetector(codec='ulaw').gate(chunks))
+        assert [len(segment) for segment in segments] == [9600, 8000], "Speech runs should coalesce"
+        
+        logger.info(f"VAD skipped {metrics['asr_work_saved']:.0%} of ASR work")
+    
+    def test_recorded_call_regression_corpus(self, audio_corpus, tmp_path):
+        """Test recorded calls stream from memory-mapped files without copies"""
+        for i in range(3):
+            audio = audio_corpus.payload('call', 2.0 + i, codec='ulaw')
+            write_wav(tmp_path / f"call_{i}.wav", audio, codec='ulaw')
+            (tmp_path / f"call_{i}.txt").write_text(f"recorded call number {i}\n")
+        (tmp_path / "notes.wav").write_bytes(b'not a wav file')
+        
+        telephony = TelephonyClient()
+        asr = ASRClient(input_codec='ulaw')
+        streamed = []
+        for recording in iter_recordings(tmp_path, 'call_*.wav'):
+            assert recording.codec == 'ulaw' and recording.sample_rate == 8000
+            call_id = telephony.initiate_call("+15551111111", "+15552222222")['call_id']
+            telephony.answer_call(call_id)
+            assert telephony.send_audio_stream(call_id, recording.data, recording.sample_rate,
+                                               sample_width=recording.sample_width)
+            
+            chunks = recording.chunks(200)
+            first = next(chunks)
+            assert isinstance(first.obj, mmap.mmap), "Chunks should be views into the mapped file"
+            
+            asr.start_session(call_id)
+            results = asr.process_streaming_audio(itertools.chain([first], chunks))
+            streamed.append((recording.path.name, recording.reference_text(), len(results)))
+        
+        assert streamed == [(f"call_{i}.wav", f"recorded call number {i}", 10 + 5 * i) for i in range(3)]
+        
+        with pytest.raises(ValueError):
+            AudioFile(tmp_path / "notes.wav")
+        
+        logger.info(f"Streamed {len(streamed)} recorded calls from disk")
+    
+    def test_asr_record_and_replay(self, audio_corpus, tmp_path):
+        """Test recorded ASR responses replay without the service, with their latency"""
+        chunks = audio_corpus.chunks('speech', 2.0, chunk_ms=200)
+        references = [f"Chunk {i}" for i in range(len(chunks))]
+        store = tmp_path / "asr_responses.db"
+        
+        service_time = ServiceTimeModel('fixed', ms=20)
+        with ASRStubServer(service_time=service_time) as server, ASRRecorder(store, mode='record') as recorder:
+            live = ASRClient(transport=HTTPASRTransport(server.url), recorder=recorder)
+            live.start_session(self.test_call_id)
+            recorded = [live.process_audio(chunk, ref) for chunk, ref in zip(chunks, references)]
+            live.transport.close()
+            profile = recorder.latency_profile()
+        assert profile.count == len(chunks) and profile.min_ms >= 20
+        
+        # No transport: every response must come from the store
+        clock = VirtualClock()
+        with ASRRecorder(store, mode='replay', simulate_latency=True, clock=clock) as recorder:
+            replay = ASRClient(clock=clock, recorder=recorder)
+            replay.start_session(self.test_call_id)
+            replayed = [replay.process_audio(chunk, ref) for chunk, ref in zip(chunks, references)]
+            
+            assert all(r['replayed'] for r in replayed)
+            assert [r['transcription'] for r in replayed] == [r['transcription'] for r in recorded]
+            assert [r['latency_ms'] for r in replayed] == pytest.approx([r['latency_ms'] for r in recorded])
+            
+            with pytest.raises(LookupError):
+                replay.process_audio(chunks[0], "Never recorded")
+            
+            replay.start_session(self.test_call_id, language="es-US")
+            with pytest.raises(LookupError):
+                replay.process_audio(chunks[0], references[0])
+            assert recorder.get_metrics()['hit_rate'] == pytest.approx(len(chunks) / (len(chunks) + 2))
+        
+        logger.info(f"Replayed {len(replayed)} ASR responses")
+    
+    def test_asr_recorder_eviction(self, tmp_path):
+        """Test the store evicts least recently used responses at its caps"""
+        clock = VirtualClock()
+        recorder = ASRRecorder(tmp_path / "capped.db", max_entries=5, clock=clock)
+        keys = [recorder.key(bytes([i]) * 160) for i in range(5)]
+        for i, key in enumerate(keys):
+            clock.advance(1)
+            recorder.record(key, f"caption {i}", 0.9, 100.0 + i)
+        
+        clock.advance(1)
+        assert recorder.lookup(keys[0]) is not None, "Refresh the oldest entry"
+        clock.advance(1)
+        recorder.record(recorder.key(b'new' * 160), "caption 5", 0.9, 105.0)
+        
+        assert recorder.lookup(keys[1]) is None, "Least recently used entry should go"
+        assert recorder.lookup(keys[0]) is not None
+        assert recorder.get_metrics()['entries'] == 5
+        
+        recorder.max_bytes = 3 * (len("caption 0") + 64)
+        recorder.record(recorder.key(b'last' * 160), "caption 6", 0.9, 106.0)
+        metrics = recorder.get_metrics()
+        assert metrics['entries'] == 3 and metrics['stored_bytes'] <= recorder.max_bytes
+        assert metrics['evicted'] == 4
+        
+        recorder.max_age_s = 0.5
+        clock.advance(1)
+        assert recorder.lookup(keys[0]) is None, "Expired entries should not replay"
+        recorder.record(keys[2], "caption 2 revised", 0.9, 102.0)
+        entries, stored_bytes = recorder.get_metrics()['entries'], recorder.get_metrics()['stored_bytes']
+        recorder.close()
+        
+        # Totals are tracked in memory and re-read from the table on open
+        with ASRRecorder(tmp_path / "capped.db") as reopened:
+            assert reopened.get_metrics()['entries'] == entries
+            assert reopened.get_metrics()['stored_bytes'] == stored_bytes
+    
+    def test_open_loop_latency_corrects_coordinated_omission(self):
+        """Test a stall counts against every request queued behind it"""
+        clock = VirtualClock()
+        calls = []
+        
+        def request():
+            calls.append(clock.time())
+            # 2ms per request, with one 500ms stall
+            clock.sleep(0.5 if len(calls) == 503 else 0.002)
+        
+        closed = LatencyMeasurement(clock, warmup=3).run(request, 1000)
+        calls.clear()
+        open_loop = LatencyMeasurement(clock, warmup=3, rate_per_s=100).run(request, 1000)
+        calls.clear()
+        corrected = LatencyMeasurement(clock, warmup=3, expected_interval_ms=10).run(request, 1000)
+        
+        # Closed loop only sees the single slow request
+        assert closed['p99_latency_ms'] == pytest.approx(2, rel=0.01)
+        assert closed['max_latency_ms'] == pytest.approx(500, rel=0.01)
+        
+        # At 100 req/s the stall delays the next ~50 requests
+        assert open_loop['mode'] == 'open-loop'
+        assert open_loop['histogram'].count == 1000
+        assert open_loop['p95_latency_ms'] > 100
+        assert open_loop['p99_latency_ms'] > 400
+        assert open_loop['service_p99_latency_ms'] == pytest.approx(2, rel=0.01)
+        assert open_loop['max_start_lag_ms'] == pytest.approx(490, rel=0.01)
+        assert open_loop['achieved_rate_per_s'] == pytest.approx(100, rel=0.01)
+        
+        assert corrected['histogram'].count == 1000 + 49
+        assert corrected['p99_latency_ms'] > 300
+        
+        logger.info(f"p99 closed {closed['p99_latency_ms']:.1f}ms, open {open_loop['p99_latency_ms']:.1f}ms")
+    
+    def test_accent_matrix_parallel(self, audio_corpus):
+        """Test the accent matrix fans out across workers and reports per-accent bounds"""
+        accents = ['en-US', 'en-IN', 'en-GB']
+        corpus = {
+            accent: [(f"please caption utterance {i} for {accent}",
+                      audio_corpus.payload('speech', 0.2, 'ulaw', level_db=-20 - i))
+                     for i in range(8)]
+            for accent in accents
+        }
+        conditions = {'clean': None, 'noisy': degrade('ulaw', noise_db=-35, loss_rate=0.1, seed=3)}
+        
+        noisy = conditions['noisy'](corpus['en-US'][0][1])
+        assert noisy == conditions['noisy'](corpus['en-US'][0][1]), "Degradation should be repeatable"
+        assert len(noisy) == len(corpus['en-US'][0][1]) and noisy != bytes(corpus['en-US'][0][1])
+        
+        # Each worker gets its own virtual clock, so every case costs exactly its own 20ms
+        asr = ASRClient(clock=VirtualClock(), processing_delay=0.02, input_codec='ulaw')
+        report = asr.test_accent_matrix(corpus, conditions, workers=8, bootstrap_resamples=200, seed=5)
+        
+        assert report['completed'] == 3 * 2 * 8 and report['failed'] == 0
+        assert report['workers'] == 8
+        assert report['sessions'] == 8, "Each worker should hold exactly one session"
+        assert set(report['accents']) == set(accents)
+        for accent, stats in report['accents'].items():
+            assert stats['total_tests'] == 16
+            assert stats['avg_wer'] == 0
+            assert stats['avg_latency_ms'] == pytest.approx(20)
+            low, high = stats['confidence_intervals']['avg_latency_ms']
+            assert low == pytest.approx(20) and high == pytest.approx(20)
+            assert stats['confidence_intervals']['corpus_wer'] == (0.0, 0.0)
+            assert set(report['cells'][accent]) == {'clean', 'noisy'}
+            assert report['cells'][accent]['noisy']['total_tests'] == 8
+            assert report['cells'][accent]['noisy']['avg_latency_ms'] == pytest.approx(20)
+        
+        serial = asr.test_different_accents({accent: corpus[accent][0] for accent in accents})
+        parallel = asr.test_different_accents({accent: corpus[accent][0] for accent in accents}, workers=3)
+        assert set(parallel) == set(serial)
+        assert all(parallel[a]['wer'] == serial[a]['wer'] for a in accents)
+        
+        logger.info(f"Accent matrix: {report['throughput_per_s']:.0f} cases/s on {report['workers']} workers")
+    
+    def test_accent_matrix_reproducible(self):
+        """Test seeded per-accent intervals do not depend on which worker finishes first"""
+        jitter = random.Random()
+        
+        class ContentLatencyASR:
+            """Stand-in client whose reported latency depends only on the audio"""
+            def start_session(self, call_id, language="en-US"):
+                pass
+            
+            def process_audio(self, audio, reference):
+                # Unseeded real work shuffles the order in which workers finish
+                time.sleep(jitter.random() / 200)
+                return {'transcription': reference, 'latency_ms': 100.0 + audio[0]}
+            
+            def end_session(self):
+                pass
+        
+        # The first two accents are in flight together, so either can finish first
+        accents = ('en-US', 'es-MX', 'en-AU', 'en-IN', 'en-GB', 'fr-CA')
+        corpus = {accent: [(f"utterance {i} in {accent}", bytes([(i * 37 + ord(accent[-1])) % 251]) * 160)
+                           for i in range(20)]
+                  for accent in accents}
+        asr = ASRClient()
+        
+        reports = [asr.test_accent_matrix(corpus, workers=30, asr_factory=ContentLatencyASR,
+                                          bootstrap_resamples=200, seed=11) for _ in range(5)]
+        
+        intervals = [{accent: stats['confidence_intervals'] for accent, stats in report['accents'].items()}
+                     for report in reports]
+        assert all(interval == intervals[0] for interval in intervals)
+        for accent in accents:
+            low, high = intervals[0][accent]['avg_latency_ms']
+            assert low <= reports[0]['accents'][accent]['avg_latency_ms'] <= high
+    
+    def test_accent_matrix_virtual_clock(self):
+        """Test parallel workers on a virtual clock each keep their own timeline"""
+        clock = VirtualClock()
+        network = NetworkEmulator(clock, latency_ms=20, seed=9)
+        asr = ASRClient(clock=clock, processing_delay=0.1, network=network)
+        corpus = {accent: [(f"utterance {i} in {accent}", bytes([i]) * 320) for i in range(12)]
+                  for accent in ('en-US', 'es-MX', 'en-AU')}
+        
+        report = asr.test_accent_matrix(corpus, workers=6, bootstrap_resamples=100, seed=1)
+        
+        # 100ms of processing plus 20ms each way; a shared clock would add other workers' sleeps
+        assert report['completed'] == 36 and report['sessions'] == 6
+        for accent, stats in report['accents'].items():
+            assert stats['avg_latency_ms'] == pytest.approx(140)
+            low, high = stats['confidence_intervals']['avg_latency_ms']
+            assert low == pytest.approx(140) and high == pytest.approx(140)
+        assert clock.time() == 0, "Workers should not advance the caller's clock"
+        assert network.stats['packets_sent'] == 0, "Workers should use their own emulated links"
+        assert network.fork(worker=3).seed == 12, "Forks are seeded with the base seed plus the worker index"
@@ -7,6 +7,9 @@ import time
 from framework.utils.telephony_client import TelephonyClient
 from framework.utils.asr_client import ASRClient
 from framework.utils.caption_delivery import CaptionDeliveryTester
+from framework.utils.captioning_pipeline import build_captioning_pipeline
+from framework.utils.caption_quality import IncrementalWERScorer
+from framework.utils.latency_histogram import LatencyHistogram
 from loguru import logger
 
 
@@ -23,7 +26,7 @@ class TestCaptioningFlow:
         self.test_from_number = "+15551111111"
         self.test_to_number = "+15552222222"
     
-    def test_complete_captioning_flow(self):
+    def test_complete_captioning_flow(self, audio_corpus):
         """Test complete flow from call to caption display"""
         # Step 1: Initiate call
         call_data = self.telephony.initiate_call(
@@ -41,7 +44,7 @@ class TestCaptioningFlow:
         
         # Step 4: Process audio through ASR
         reference_text = "Hello, this is a test call with captioning."
-        audio_data = b'\x00' * 8000
+        audio_data = audio_corpus.payload('speech', 1.0, codec='ulaw')
         asr_result = self.asr.process_audio(audio_data, reference_text)
         
         assert 'transcription' in asr_result
@@ -116,6 +119,7 @@ class TestCaptioningFlow:
         ]
         
         captions_delivered = []
+        scorer = IncrementalWERScorer(" ".join(test_phrases))
         
         for phrase in test_phrases:
             audio_data = b'\x00' * 2000
@@ -127,8 +131,12 @@ class TestCaptioningFlow:
                 asr_result['timestamp']
             )
             captions_delivered.append(caption)
+            
+            running_wer = scorer.append(caption['text'])
+            logger.info(f"Running WER after {len(captions_delivered)} captions: {running_wer:.4f}")
         
         assert len(captions_delivered) == len(test_phrases)
+        assert scorer.wer == 0.0, "Complete caption stream should match the reference"
         
         # Verify ordering
         timestamps = [c['timestamp'] for c in captions_delivered]
@@ -159,33 +167,68 @@ class TestCaptioningFlow:
             
             logger.info(f"End-to-end accuracy: {accuracy:.4f}")
     
-    def test_multiple_concurrent_calls(self):
+    def test_multiple_concurrent_calls(self, audio_corpus):
         """Test handling multiple concurrent calls"""
-        call_ids = []
+        pipeline = build_captioning_pipeline(
+            self.telephony, lambda: ASRClient(processing_delay=0.02), self.delivery,
+            asr_workers=3
+        )
         
         # Initiate multiple calls
+        calls = []
         for i in range(3):
             call_data = self.telephony.initiate_call(
                 f"+1555111111{i}",
                 self.test_to_number
             )
-            call_ids.append(call_data['call_id'])
-            self.telephony.answer_call(call_data['call_id'])
-        
-        # Process audio for each call
-        for call_id in call_ids:
-            self.asr.start_session(call_id)
-            audio_data = b'\x00' * 4000
-            asr_result = self.asr.process_audio(audio_data, f"Test call {call_id}")
-            
-            caption = self.delivery.deliver_caption(
-                call_id,
-                asr_result['transcription']
-            )
-            assert caption['call_id'] == call_id
+            # Clean, clipped and lossy lines
+            audio = audio_corpus.payload('call', 0.5, codec='ulaw', clip_db=[None, -12, None][i],
+                                         loss_rate=[0.0, 0.0, 0.1][i])
+            calls.append({'call_id': call_data['call_id'], 'audio': audio, 'sample_width': 1,
+                          'reference': f"Test call {call_data['call_id']}"})
+        
+        # Answer, transcribe and caption every call concurrently
+        results = pipeline.run(calls)
+        
+        assert len(results) == len(calls)
+        for result in results:
+            assert result['error'] is None, result['error']
+            call = result['item']
+            assert call['caption']['call_id'] == call['call_id']
+            assert call['caption']['text'] == call['reference']
+        
+        metrics = pipeline.get_metrics()
+        assert metrics['completed'] == len(calls)
+        assert set(metrics['stages']) == {'telephony', 'asr', 'delivery'}
         
         # End all calls
-        for call_id in call_ids:
-            self.telephony.end_call(call_id)
+        for call in calls:
+            self.telephony.end_call(call['call_id'])
         
-        logger.info(f"Handled {len(call_ids)} concurrent calls successfully")
+        logger.info(f"Handled {len(calls)} concurrent calls successfully, "
+                   f"max end-to-end {metrics['end_to_end']['max_latency_ms']:.1f}ms")
+    
+    def test_delivery_latency_percentiles(self):
+        """Test delivery latency percentiles from the shared latency histogram"""
+        results = self.delivery.test_delivery_latency(num_captions=200)
+        
+        assert results['total_captions'] == 200
+        assert results['min_latency_ms'] <= results['p50_latency_ms'] <= results['p95_latency_ms']
+        assert results['p95_latency_ms'] <= results['p99_latency_ms'] <= results['max_latency_ms']
+        assert self.delivery.get_delivery_metrics()['total_deliveries'] == 200
+        
+        # Histograms from separate testers merge into one distribution
+        samples = [10.0 * (i + 1) for i in range(1000)]
+        first, second = LatencyHistogram(), LatencyHistogram()
+        for i, latency_ms in enumerate(samples):
+            (first if i % 2 else second).record(latency_ms)
+        merged = first.snapshot().merge(second)
+        
+        assert merged.count == len(samples)
+        assert first.count == len(samples) // 2
+        for percent in (50, 95, 99, 99.9):
+            exact = sorted(samples)[int(len(samples) * percent / 100)]
+            assert merged.percentile(percent) == pytest.approx(exact, rel=0.01)
+        
+        logger.info(f"Delivery p95: {results['p95_latency_ms']:.3f}ms, "
+                   f"p99: {results['p99_latency_ms']:.3f}ms")